@@ -0,0 +1,97 @@
+"""
+Compares memory use and construction time of the pydantic domain models with the
+compact records used inside the scrape pipeline.
+
+Usage: python -m benchmarks.compact_records [submissions] [standings]
+"""
+import sys
+import time
+import tracemalloc
+
+from models.domain.problem_result import ProblemResult
+from models.domain.standing import ParticipationType, Standing
+from models.domain.submission import Submission
+from models.records.problem_result_record import ProblemResultRecord
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
+
+LANGUAGES = ["GNU C++17", "Python 3", "PyPy 3-64", "Java 21"]
+VERDICTS = ["Accepted", "Wrong answer on test 2", "Time limit exceeded on test 7"]
+PROBLEMS = 12
+
+
+def build_submissions(cls, count: int):
+    return [
+        cls(
+            id=i,
+            submission_time_utc=1696000000 + i,
+            handle=sys.intern(f"user{i % 3000}"),
+            is_virtual=i % 5 == 0,
+            problem_index=chr(ord("A") + i % PROBLEMS),
+            language=LANGUAGES[i % len(LANGUAGES)],
+            verdict=VERDICTS[i % len(VERDICTS)],
+            time=i % 2000,
+            memory=i % 262144,
+        )
+        for i in range(count)
+    ]
+
+
+def build_standings(cls, result_cls, count: int):
+    return [
+        cls(
+            solved=i % PROBLEMS,
+            rank=i + 1,
+            handle=sys.intern(f"user{i}"),
+            penalty=i * 3,
+            problem_results=[
+                result_cls(
+                    tries=p % 3,
+                    submission_id=i * PROBLEMS + p if p % 2 else None,
+                    submission_contest_minutes=p * 10 if p % 2 else None,
+                    is_accepted=p % 2 == 1,
+                    index=chr(ord("A") + p),
+                )
+                for p in range(PROBLEMS)
+            ],
+            participation_type=ParticipationType.IN_CONTEST,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(name: str, build):
+    # timed without tracing, which slows allocation down considerably
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    values = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed * 1000:>9.1f} ms {current / 2**20:>9.1f} MiB")
+    return values
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    standings = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+
+    print(f"{submissions} submissions, {standings} standings of {PROBLEMS} problems")
+    measure("Submission (pydantic)", lambda: build_submissions(Submission, submissions))
+    measure(
+        "SubmissionRecord", lambda: build_submissions(SubmissionRecord, submissions)
+    )
+    measure(
+        "Standing (pydantic)",
+        lambda: build_standings(Standing, ProblemResult, standings),
+    )
+    measure(
+        "StandingRecord",
+        lambda: build_standings(StandingRecord, ProblemResultRecord, standings),
+    )
+
+
+if __name__ == "__main__":
+    main()
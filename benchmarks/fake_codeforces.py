@@ -0,0 +1,311 @@
+"""
+A fake codeforces for benchmarks. It serves /enter, /gym/{id},
+/gym/{id}/standings/page/{n}, /gym/{id}/status?pageIndex=n and
+/gym/{id}/submission/{id} through an httpx mock transport, either replaying
+recorded pages or rendering a synthetic gym with the markup the parsers expect.
+"""
+import asyncio
+import datetime
+import os
+import random
+import re
+from dataclasses import dataclass, field
+
+import httpx
+
+LOGGED_IN_HEADER = (
+    '<div class="lang-chooser"><a href="/0123456789/logout">Logout</a></div>'
+)
+LOGIN_PAGE = '<html><body><form><input type="hidden" name="csrf_token" value="0123456789abcdef"/></form></body></html>'
+LANGUAGES = ["GNU C++17", "GNU C++20 (64)", "Python 3", "PyPy 3-64", "Java 21"]
+WRONG_VERDICTS = ["Wrong answer on test 2", "Time limit exceeded on test 7"]
+# codeforces shows 50 submissions per status page and 100 participants per standings page
+STATUS_PAGE_SIZE = 50
+STANDINGS_PAGE_SIZE = 100
+
+
+@dataclass
+class SyntheticGym:
+    submissions: int
+    participants: int
+    problems: int = 10
+    seed: int = 0
+    # Unix timestamp in utc time of the contest start
+    start_utc: int = 1696154400
+    kinds: list[str] = field(init=False)
+    rows: list[tuple] = field(init=False)
+    standings: list[tuple] = field(init=False)
+
+    def __post_init__(self):
+        rnd = random.Random(self.seed)
+        self.kinds = rnd.choices(
+            ["in", "virtual", "after"], [0.7, 0.2, 0.1], k=self.participants
+        )
+
+        # id, handle, problem, verdict, language, when (utc), time, memory
+        self.rows = []
+        accepted: dict[tuple[int, int], int] = {}
+        tries: dict[tuple[int, int], int] = {}
+        for submission_id in range(1, self.submissions + 1):
+            participant = rnd.randrange(self.participants)
+            problem = rnd.randrange(self.problems)
+            key = (participant, problem)
+            if key not in accepted and rnd.random() < 0.4:
+                verdict = "Accepted"
+                accepted[key] = submission_id
+            else:
+                verdict = rnd.choice(WRONG_VERDICTS)
+                if key not in accepted:
+                    tries[key] = tries.get(key, 0) + 1
+            when = self.start_utc + submission_id * 5 * 60 * 60 // self.submissions
+            self.rows.append(
+                (
+                    submission_id,
+                    participant,
+                    problem,
+                    verdict,
+                    rnd.choice(LANGUAGES),
+                    when,
+                    rnd.randint(15, 2000),
+                    rnd.randint(0, 262144),
+                )
+            )
+        when_by_id = {row[0]: row[5] for row in self.rows}
+
+        # participant, kind, solved, penalty, cells as (tries, accepted id, minutes)
+        self.standings = []
+        for participant in range(self.participants):
+            cells = []
+            solved = penalty = 0
+            for problem in range(self.problems):
+                key = (participant, problem)
+                wrong = tries.get(key, 0)
+                if key in accepted:
+                    minutes = (when_by_id[accepted[key]] - self.start_utc) // 60
+                    cells.append((wrong, accepted[key], minutes))
+                    solved += 1
+                    penalty += minutes + 20 * wrong
+                else:
+                    cells.append((wrong, None, None))
+            self.standings.append(
+                (participant, self.kinds[participant], solved, penalty, cells)
+            )
+        self.standings.sort(key=lambda standing: (-standing[2], standing[3]))
+
+    @property
+    def status_pages(self) -> int:
+        return max(1, -(-self.submissions // STATUS_PAGE_SIZE))
+
+    @property
+    def standings_pages(self) -> int:
+        return max(1, -(-self.participants // STANDINGS_PAGE_SIZE))
+
+    def handle(self, participant: int) -> str:
+        return f"Contestant{participant}"
+
+    def render_gym_page(self) -> str:
+        rows = "".join(
+            f'<tr><td class="id"><a href="/gym/1/problem/{chr(65 + i)}">\n {chr(65 + i)} </a></td>'
+            f'<td><div><div><a href="/gym/1/problem/{chr(65 + i)}"><!--\n-->\n Problem {i}\n</a></div></div></td>'
+            f'<td><a href="/gym/1/submit/{chr(65 + i)}">Submit</a></td><td><a>x{i}</a></td></tr>'
+            for i in range(self.problems)
+        )
+        return (
+            f"<html><body>{LOGGED_IN_HEADER}"
+            '<div class="roundbox sidebox"><span class="contest-state-phase">Finished</span></div>'
+            '<table class="problems"><tr><th>#</th><th>Name</th><th></th><th></th></tr>'
+            f'{rows}<tr><td colspan="4"></td></tr></table></body></html>'
+        )
+
+    def render_standings_page(self, page: int) -> str:
+        pagination = ""
+        if self.standings_pages > 1:
+            pagination = (
+                '<div class="custom-links-pagination">'
+                + "".join(
+                    f'<nobr><a href="/gym/1/standings/page/{i}">{i}</a></nobr>'
+                    for i in range(1, self.standings_pages + 1)
+                )
+                + "</div>"
+            )
+        header = "".join(
+            f'<th><a href="/gym/1/problem/{chr(65 + i)}">{chr(65 + i)}</a></th>'
+            for i in range(self.problems)
+        )
+        start = (page - 1) * STANDINGS_PAGE_SIZE
+        rows = []
+        for position, (participant, kind, solved, penalty, cells) in enumerate(
+            self.standings[start : start + STANDINGS_PAGE_SIZE], start + 1
+        ):
+            rank = "&nbsp;" if kind == "after" else str(position)
+            sup = (
+                '<sup title="Virtual participant">#</sup>' if kind == "virtual" else ""
+            )
+            problem_cells = "".join(
+                f'<td acceptedSubmissionId="{accepted_id}"><span class="cell-accepted">+{wrong or ""}</span>'
+                f'<span class="cell-time">{minutes // 60:02d}:{minutes % 60:02d}</span></td>'
+                if accepted_id is not None
+                else f'<td><span class="cell-rejected">-{wrong or ""}</span></td>'
+                for wrong, accepted_id, minutes in cells
+            )
+            rows.append(
+                f'<tr participantId="{participant}"><td>{rank}</td>'
+                f'<td><a href="/profile/{self.handle(participant)}">{self.handle(participant)}</a>{sup}</td>'
+                f"<td>{solved}</td><td>{penalty}</td>{problem_cells}</tr>"
+            )
+        return (
+            f"<html><body>{LOGGED_IN_HEADER}{pagination}"
+            '<input type="checkbox" id="showUnofficial" checked="checked"/>'
+            '<table class="standings"><tr><th>#</th><th>Who</th><th>=</th><th>Penalty</th>'
+            f'{header}</tr>{"".join(rows)}</table></body></html>'
+        )
+
+    def render_status_page(self, page: int) -> str:
+        pagination = ""
+        if self.status_pages > 1:
+            pagination = (
+                '<div class="pagination"><ul>'
+                + "".join(
+                    f'<li><span class="page-index" pageIndex="{i}"><a href="#">{i}</a></span></li>'
+                    for i in range(1, self.status_pages + 1)
+                )
+                + "</ul></div>"
+            )
+        moscow = datetime.timezone(datetime.timedelta(hours=3))
+        end = len(self.rows) - (page - 1) * STATUS_PAGE_SIZE
+        rows = []
+        for (
+            submission_id,
+            participant,
+            problem,
+            verdict,
+            language,
+            when,
+            time,
+            memory,
+        ) in reversed(self.rows[max(0, end - STATUS_PAGE_SIZE) : max(0, end)]):
+            sup = "<sup>#</sup>" if self.kinds[participant] == "virtual" else ""
+            when_text = datetime.datetime.fromtimestamp(when, moscow).strftime(
+                "%b/%d/%Y %H:%M"
+            )
+            rows.append(
+                f'<tr data-submission-id="{submission_id}">'
+                f'<td><a href="/gym/1/submission/{submission_id}">{submission_id}</a></td>'
+                f'<td><span class="format-time">{when_text}</span></td>'
+                f'<td><a href="/profile/{self.handle(participant)}">{self.handle(participant)}</a>{sup}</td>'
+                f'<td><a href="/gym/1/problem/{chr(65 + problem)}">{chr(65 + problem)} - Problem {problem}</a></td>'
+                f"<td>{language}</td>"
+                f'<td><span class="verdict">{verdict}</span></td>'
+                f"<td>{time}&nbsp;ms</td><td>{memory}&nbsp;KB</td></tr>"
+            )
+        return (
+            f"<html><body>{LOGGED_IN_HEADER}{pagination}"
+            '<table class="status-frame-datatable"><tr><th>#</th><th>When</th><th>Who</th>'
+            "<th>Problem</th><th>Lang</th><th>Verdict</th><th>Time</th><th>Memory</th></tr>"
+            f'{"".join(rows)}</table></body></html>'
+        )
+
+    def render_submission_page(self, submission_id: int) -> str:
+        _, participant, problem, verdict, language, when, time, memory = self.rows[
+            submission_id - 1
+        ]
+        moscow = datetime.timezone(datetime.timedelta(hours=3))
+        when_text = datetime.datetime.fromtimestamp(when, moscow).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        return (
+            f"<html><body>{LOGGED_IN_HEADER}<table><tr><th>#</th></tr>"
+            f"<tr><td>{submission_id}</td><td>{self.handle(participant)}</td>"
+            f"<td>{chr(65 + problem)}</td><td>{language}</td><td>{verdict}</td>"
+            f"<td>{time} ms</td><td>{memory} KB</td><td></td><td>{when_text}</td></tr>"
+            '</table><pre id="program-source-text">int main() {}</pre></body></html>'
+        )
+
+
+class FakeCodeforces:
+    """
+    Serves a gym through an httpx transport. Pages found in recorded_dir (enter.html,
+    gym.html, standings_{n}.html, status_{n}.html) are replayed, other pages are
+    rendered from the synthetic gym. Rendered pages are kept, so rendering cost
+    doesn't count against the scraper.
+    """
+
+    def __init__(
+        self,
+        gym: SyntheticGym,
+        latency: float = 0.0,
+        recorded_dir: str | None = None,
+    ) -> None:
+        self.gym = gym
+        # seconds added to every response, to model the network round trip
+        self.latency = latency
+        self.recorded_dir = recorded_dir
+        self.pages: dict[str, str] = {}
+        self.requests = 0
+
+    def page(self, name: str, render) -> str:
+        if name not in self.pages:
+            recorded = (
+                os.path.join(self.recorded_dir, f"{name}.html")
+                if self.recorded_dir
+                else None
+            )
+            if recorded and os.path.exists(recorded):
+                with open(recorded) as file:
+                    self.pages[name] = file.read()
+            else:
+                self.pages[name] = render()
+        return self.pages[name]
+
+    def prerender(self):
+        self.page("gym", self.gym.render_gym_page)
+        for page in range(1, self.gym.standings_pages + 1):
+            self.page(f"standings_{page}", lambda: self.gym.render_standings_page(page))
+        for page in range(1, self.gym.status_pages + 1):
+            self.page(f"status_{page}", lambda: self.gym.render_status_page(page))
+
+    async def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.url.path
+        if path == "/enter":
+            if request.method == "POST":
+                return httpx.Response(200, text=LOGGED_IN_HEADER)
+            return httpx.Response(200, text=self.page("enter", lambda: LOGIN_PAGE))
+
+        standings = re.fullmatch(r"/gym/\d+/standings/page/(\d+)", path)
+        if standings:
+            page = int(standings[1])
+            if request.method == "POST":
+                return httpx.Response(200, text=LOGGED_IN_HEADER)
+            return httpx.Response(
+                200,
+                text=self.page(
+                    f"standings_{page}", lambda: self.gym.render_standings_page(page)
+                ),
+            )
+
+        if re.fullmatch(r"/gym/\d+/status", path):
+            page = int(request.url.params.get("pageIndex", "1"))
+            return httpx.Response(
+                200,
+                text=self.page(
+                    f"status_{page}", lambda: self.gym.render_status_page(page)
+                ),
+            )
+
+        submission = re.fullmatch(r"/gym/\d+/submission/(\d+)", path)
+        if submission and 1 <= int(submission[1]) <= len(self.gym.rows):
+            return httpx.Response(
+                200, text=self.gym.render_submission_page(int(submission[1]))
+            )
+
+        if re.fullmatch(r"/gym/\d+", path):
+            return httpx.Response(200, text=self.page("gym", self.gym.render_gym_page))
+
+        return httpx.Response(404)
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        return httpx.MockTransport(self.handle_request)
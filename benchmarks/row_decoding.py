@@ -0,0 +1,109 @@
+"""
+Measures the per row cost of decoding status page cells, comparing the memoized
+decoders of scraper.row_decoding with decoding every row from scratch, and the per
+row cost of parsing whole status and standings pages.
+
+Usage: python -m benchmarks.row_decoding [submissions]
+"""
+import datetime
+import sys
+import time
+
+import pytz
+
+from benchmarks.fake_codeforces import SyntheticGym
+from scraper.row_decoding import (
+    handle_from_href,
+    moscow_minute_to_utc,
+    parse_digits,
+)
+from scraper.soup import make_soup
+from scraper.standing_page_parser import parse_standings
+from scraper.status_page_parser import STATUS_PAGE_TARGETS, parse_status_page
+
+
+def decode_from_scratch(when: str, href: str, time_text: str, memory_text: str):
+    when_utc = int(
+        pytz.timezone("Europe/Moscow")
+        .localize(datetime.datetime.strptime(when, "%b/%d/%Y %H:%M"))
+        .astimezone(pytz.utc)
+        .timestamp()
+    )
+    handle = sys.intern(href.split("/")[-1].strip().lower())
+    time_ms = int("".join(filter(lambda ch: ch.isdigit(), time_text.strip())))
+    memory = int("".join(filter(lambda ch: ch.isdigit(), memory_text.strip())))
+    return when_utc, handle, time_ms, memory
+
+
+def decode_memoized(when: str, href: str, time_text: str, memory_text: str):
+    return (
+        moscow_minute_to_utc(when),
+        handle_from_href(href),
+        parse_digits(time_text),
+        parse_digits(memory_text),
+    )
+
+
+def status_cells(pages: list[str]) -> list[tuple[str, str, str, str]]:
+    cells = []
+    for page in pages:
+        table = make_soup(page, STATUS_PAGE_TARGETS).find("table")
+        for row in table.find_all("tr")[1:]:
+            row_cells = row.find_all("td", recursive=False)
+            cells.append(
+                (
+                    row_cells[1].text.strip(),
+                    row_cells[2].find("a")["href"],
+                    row_cells[6].text,
+                    row_cells[7].text,
+                )
+            )
+    return cells
+
+
+def microseconds_per_row(function, rows: list, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            function(*row)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6 / len(rows)
+
+
+def parse_microseconds_per_row(parser, pages: list[str]) -> float:
+    start = time.perf_counter()
+    rows = sum(len(parser(page)) for page in pages)
+    return (time.perf_counter() - start) * 1e6 / rows
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    gym = SyntheticGym(submissions, max(1, submissions // 10))
+    status_pages = [
+        gym.render_status_page(page) for page in range(1, gym.status_pages + 1)
+    ]
+    standings_pages = [
+        gym.render_standings_page(page) for page in range(1, gym.standings_pages + 1)
+    ]
+    rows = status_cells(status_pages)
+    # a single cold pass, so memoized conversions are paid for once
+    moscow_minute_to_utc.cache_clear()
+
+    print(f"{len(rows)} status rows, per row:")
+    print(
+        f"  decode from scratch {microseconds_per_row(decode_from_scratch, rows):8.2f} us"
+    )
+    print(
+        f"  decode memoized     {microseconds_per_row(decode_memoized, rows, repeat=1):8.2f} us"
+    )
+    print(
+        f"  parse status page   {parse_microseconds_per_row(parse_status_page, status_pages):8.2f} us"
+    )
+    print(
+        f"  parse standings     {parse_microseconds_per_row(parse_standings, standings_pages):8.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
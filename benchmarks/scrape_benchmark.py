@@ -0,0 +1,146 @@
+"""
+Measures scraper throughput offline against a fake codeforces, for synthetic gyms of
+different sizes: pages per second of a full scrape, parse time per page, summary
+end to end latency and peak RSS.
+
+Usage: python -m benchmarks.scrape_benchmark [--sizes small,medium,large]
+           [--latency SECONDS] [--parse-executor process|thread|inline]
+           [--concurrency N] [--recorded-dir DIR]
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+from benchmarks.fake_codeforces import FakeCodeforces, SyntheticGym
+from models.requests.contest_summary_request import ContestSummaryRequest
+from scraper.page_loader import PageLoader
+from scraper.parse_executor import ParseExecutor
+from scraper.rate_limiter import RateLimiter
+from scraper.standing_page_parser import parse_standings
+from scraper.status_page_parser import parse_status_page
+from service.codeforces_service import CodeForcesService
+
+# submissions, participants
+SIZES = {
+    "small": (500, 100),
+    "medium": (10_000, 1_000),
+    "large": (100_000, 5_000),
+}
+# pages parsed per listing to measure the parse time per page
+PARSE_SAMPLE_PAGES = 20
+
+
+def create_service(
+    upstream: FakeCodeforces, parse_executor: ParseExecutor, concurrency: int
+) -> CodeForcesService:
+    # the rate limit is lifted, the benchmark measures the scraper, not the limiter
+    rate_limiter = RateLimiter(rate=1e6, burst=10**6, max_rate=1e6)
+    page_loader = PageLoader(
+        {"handleOrEmail": "benchmark", "password": "benchmark"},
+        rate_limiter,
+        upstream.transport(),
+    )
+    return CodeForcesService(
+        page_loader, asyncio.Semaphore(concurrency), parse_executor=parse_executor
+    )
+
+
+def parse_ms_per_page(upstream: FakeCodeforces, name: str, parser, pages: int):
+    sample = range(1, min(pages, PARSE_SAMPLE_PAGES) + 1)
+    start = time.perf_counter()
+    for page in sample:
+        parser(upstream.pages[f"{name}_{page}"])
+    return (time.perf_counter() - start) * 1000 / len(sample)
+
+
+def peak_rss_mib() -> tuple[float, float]:
+    # ru_maxrss is in KiB on linux, parse workers are counted separately, so this
+    # returns the peak of this process and the peak of the largest worker
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+async def benchmark(size: str, args) -> dict:
+    submissions, participants = SIZES[size]
+    gym = SyntheticGym(submissions, participants)
+    upstream = FakeCodeforces(gym, args.latency, args.recorded_dir)
+    upstream.prerender()
+    parse_executor = ParseExecutor(args.parse_executor)
+
+    try:
+        service = create_service(upstream, parse_executor, args.concurrency)
+        await service.page_loader.authenticate()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            service.get_contest_standings(1), service.get_contest_submissions(1)
+        )
+        scrape_seconds = time.perf_counter() - start
+        pages = gym.standings_pages + gym.status_pages
+        await service.page_loader.close()
+    finally:
+        parse_executor.close()
+
+    # a fresh service without a cache, and a fresh parse executor without a memo of
+    # the pages parsed above, so the summary scrapes and parses everything again
+    parse_executor = ParseExecutor(args.parse_executor)
+    try:
+        service = create_service(upstream, parse_executor, args.concurrency)
+        await service.page_loader.authenticate()
+        request = ContestSummaryRequest(
+            gym_id=1,
+            virtual_enabled=True,
+            virtual_deadline_utc=gym.start_utc + 3 * 60 * 60,
+            handles=[gym.handle(i) for i in range(min(participants, 100))],
+        )
+        start = time.perf_counter()
+        await service.get_contest_summary(request)
+        summary_seconds = time.perf_counter() - start
+        await service.page_loader.close()
+    finally:
+        parse_executor.close()
+
+    rss, children_rss = peak_rss_mib()
+    return {
+        "size": size,
+        "pages": pages,
+        "pages/s": pages / scrape_seconds,
+        "standings ms/page": parse_ms_per_page(
+            upstream, "standings", parse_standings, gym.standings_pages
+        ),
+        "status ms/page": parse_ms_per_page(
+            upstream, "status", parse_status_page, gym.status_pages
+        ),
+        "summary s": summary_seconds,
+        "peak RSS MiB": rss,
+        "workers RSS MiB": children_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--parse-executor", default="process")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--recorded-dir", default=None)
+    args = parser.parse_args()
+
+    columns = None
+    for size in args.sizes.split(","):
+        result = asyncio.run(benchmark(size, args))
+        if columns is None:
+            columns = list(result)
+            print("  ".join(f"{column:>17}" for column in columns))
+        print(
+            "  ".join(
+                f"{value:>17.2f}" if isinstance(value, float) else f"{value:>17}"
+                for value in result.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
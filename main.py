@@ -1,33 +1,319 @@
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal
 
 import httpx
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel
 
 from models.domain.problem import Problem
-from models.domain.standing import Standing
+from models.domain.standing import ParticipationType, Standing
 from models.domain.submission import Submission
+from models.domain.submission_detail import SubmissionDetail
 from models.requests.contest_summary_request import ContestSummaryRequest
+from models.responses.batch_contest_summary import GymSummaries
 from models.responses.contest_summary import ContestSummary
+from models.responses.crawl_status import CrawlStatus
 from models.responses.jsend_response import JSendResponse
-from scraper.page_loader import PageLoader
+from monitoring.metrics import format_server_timing, server_timings
+from scraper.parse_executor import ParseExecutor
+from scraper.session_pool import SessionPool
 from service.codeforces_service import CodeForcesService
+from service.leases import open_leases
+from service.listing_filters import StandingFilter, SubmissionFilter
+from service.refresh_scheduler import RefreshScheduler
+from service.response_cache import EncodedResponse, ResponseCache, dump_jsend, project
+from service.scrape_cache import ScrapeCache
+from service.snapshot import (
+    ContestSnapshot,
+    import_snapshot,
+    read_snapshot,
+    write_snapshot,
+)
+from service.standings_feed import StandingsFeeds
+from service.submission_crawler import SubmissionCrawler
+from service.submission_store import SubmissionStore
+from service.summary_engine import SummaryEngine
+from service.watch_registry import WatchRegistry
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+# httpx logs every request at info level, which is too chatty for page scrapes
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
 description = """
 The CodeForces Contest API is a service that provides 
 access to various features and information related to CodeForces contests. 
 It allows users to retrieve contest summaries, submissions, problems, and standings for a specific contest.
 """
 
-app = FastAPI(title="CodeForces Contest API", version="0.1.0", description=description)
+
+def parse_credentials(credentials: str) -> list[tuple[str, str]]:
+    """Parses comma separated handle:password pairs, a malformed pair is named without its password."""
+    pairs = []
+    for number, pair in enumerate(credentials.split(","), 1):
+        pair = pair.strip()
+        if not pair:
+            continue
+        handle, _, password = pair.partition(":")
+        if pair.count(":") != 1 or not handle.strip() or not password:
+            raise ValueError(
+                f"CODEFORCES_CREDENTIALS entry {number} ({handle.strip()!r}) "
+                "must be handle:password"
+            )
+        pairs.append((handle.strip(), password))
+    return pairs
+
+
+def worker_share(configuration: dict, workers: int) -> dict:
+    """Splits the upstream budgets between the workers, so more workers don't put more load on codeforces."""
+    share = {
+        key: configuration[key] / workers
+        for key in ("rateLimit", "rateLimitMin", "rateLimitMax")
+    }
+    for key in (
+        "rateLimitBurst",
+        "sessionPoolSize",
+        "maxConnections",
+        "maxKeepaliveConnections",
+        "maxConcurrentRequests",
+        "crawlConcurrency",
+    ):
+        share[key] = max(1, configuration[key] // workers)
+    share["parseWorkers"] = max(
+        1, (configuration["parseWorkers"] or os.cpu_count() or 1) // workers
+    )
+    return share
+
+
+workers = int(os.getenv("CODEFORCES_WORKERS", "1"))
 
 configuration = {
     "handleOrEmail": os.getenv("CODEFORCES_HANDLE"),
     "password": os.getenv("CODEFORCES_PASSWORD"),
+    # several accounts, used instead of the handle and password above when given
+    "credentials": parse_credentials(os.getenv("CODEFORCES_CREDENTIALS", "")),
+    "sessionPoolSize": int(os.getenv("CODEFORCES_SESSION_POOL_SIZE", "4")),
+    "sessionMaxAge": int(os.getenv("CODEFORCES_SESSION_MAX_AGE", str(6 * 60 * 60))),
+    "maxConnections": int(os.getenv("CODEFORCES_MAX_CONNECTIONS", "20")),
+    "maxKeepaliveConnections": int(
+        os.getenv("CODEFORCES_MAX_KEEPALIVE_CONNECTIONS", "10")
+    ),
+    "maxConcurrentRequests": int(os.getenv("CODEFORCES_MAX_CONCURRENT_REQUESTS", "10")),
+    "rateLimit": float(os.getenv("CODEFORCES_RATE_LIMIT", "10")),
+    "rateLimitBurst": int(os.getenv("CODEFORCES_RATE_LIMIT_BURST", "10")),
+    "rateLimitMin": float(os.getenv("CODEFORCES_RATE_LIMIT_MIN", "1")),
+    "rateLimitMax": float(os.getenv("CODEFORCES_RATE_LIMIT_MAX", "20")),
+    "maxRetries": int(os.getenv("CODEFORCES_MAX_RETRIES", "4")),
+    "cachePath": os.getenv("CODEFORCES_CACHE_PATH", "scrape_cache.sqlite3"),
+    "cacheRunningTtl": float(os.getenv("CODEFORCES_CACHE_RUNNING_TTL", "60")),
+    "cacheMemoryEntries": int(os.getenv("CODEFORCES_CACHE_MEMORY_ENTRIES", "64")),
+    "parseExecutor": os.getenv("CODEFORCES_PARSE_EXECUTOR", "process"),
+    "parseWorkers": int(os.getenv("CODEFORCES_PARSE_WORKERS", "0")) or None,
+    "parseMemoEntries": int(os.getenv("CODEFORCES_PARSE_MEMO_ENTRIES", "256")),
+    "pageStoreEntries": int(os.getenv("CODEFORCES_PAGE_STORE_ENTRIES", "512")),
+    "watchRegistryPath": os.getenv(
+        "CODEFORCES_WATCH_REGISTRY_PATH", "watched_gyms.json"
+    ),
+    "refreshRunningInterval": float(
+        os.getenv("CODEFORCES_REFRESH_RUNNING_INTERVAL", "30")
+    ),
+    "refreshFinishedInterval": float(
+        os.getenv("CODEFORCES_REFRESH_FINISHED_INTERVAL", str(6 * 60 * 60))
+    ),
+    "submissionStorePath": os.getenv(
+        "CODEFORCES_SUBMISSION_STORE_PATH", "submission_details.sqlite3"
+    ),
+    "crawlConcurrency": int(os.getenv("CODEFORCES_CRAWL_CONCURRENCY", "4")),
+    "feedInterval": float(os.getenv("CODEFORCES_FEED_INTERVAL", "15")),
+    "responseCacheEntries": int(os.getenv("CODEFORCES_RESPONSE_CACHE_ENTRIES", "32")),
+    "serverTiming": os.getenv("SERVER_TIMING", "false").lower() == "true",
+    "workers": workers,
+    # "sqlite" for leases in the cache file, a redis:// url, or empty for none
+    "leases": os.getenv("CODEFORCES_LEASES", "sqlite" if workers > 1 else ""),
+    "leaseTtl": float(os.getenv("CODEFORCES_LEASE_TTL", "30")),
 }
+if workers > 1:
+    configuration.update(worker_share(configuration, workers))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.leases = open_leases(
+        configuration["leases"], configuration["cachePath"], configuration["leaseTtl"]
+    )
+    app.state.session_pool = SessionPool(
+        configuration, configuration["sessionPoolSize"]
+    )
+    # one upstream concurrency budget shared by every request the app serves
+    app.state.concurrency_budget = asyncio.Semaphore(
+        configuration["maxConcurrentRequests"]
+    )
+    app.state.scrape_cache = ScrapeCache(
+        configuration["cachePath"],
+        configuration["cacheRunningTtl"],
+        configuration["cacheMemoryEntries"],
+        app.state.leases,
+    )
+    app.state.parse_executor = ParseExecutor(
+        configuration["parseExecutor"],
+        configuration["parseWorkers"],
+        configuration["parseMemoEntries"],
+    )
+    app.state.summary_engine = SummaryEngine()
+    app.state.watch_registry = WatchRegistry(configuration["watchRegistryPath"])
+    app.state.refresh_scheduler = RefreshScheduler(
+        app.state.watch_registry,
+        app.state.scrape_cache,
+        app.state.concurrency_budget,
+        lambda: create_codeforces_service(app),
+        configuration["refreshRunningInterval"],
+        configuration["refreshFinishedInterval"],
+        leases=app.state.leases,
+    )
+    app.state.refresh_scheduler.start()
+    app.state.submission_store = SubmissionStore(configuration["submissionStorePath"])
+    app.state.submission_crawler = SubmissionCrawler(
+        app.state.submission_store,
+        app.state.session_pool,
+        app.state.concurrency_budget,
+        app.state.parse_executor,
+        configuration["crawlConcurrency"],
+        leases=app.state.leases,
+    )
+    await app.state.submission_crawler.start()
+    app.state.standings_feeds = StandingsFeeds(
+        lambda: create_codeforces_service(app),
+        configuration["feedInterval"],
+        leases=app.state.leases,
+    )
+    app.state.response_cache = ResponseCache(configuration["responseCacheEntries"])
+    yield
+    await app.state.standings_feeds.close()
+    await app.state.submission_crawler.stop()
+    await app.state.refresh_scheduler.stop()
+    await app.state.session_pool.close()
+    app.state.submission_store.close()
+    app.state.scrape_cache.close()
+    app.state.parse_executor.close()
+    if app.state.leases is not None:
+        await app.state.leases.close()
+
+
+app = FastAPI(
+    title="CodeForces Contest API",
+    version="0.1.0",
+    description=description,
+    lifespan=lifespan,
+)
+
+
+if configuration["serverTiming"]:
+
+    @app.middleware("http")
+    async def add_server_timing(request: Request, call_next):
+        """Reports how long each service phase of the request took in a Server-Timing header."""
+        timings: list[tuple[str, float]] = []
+        server_timings.set(timings)
+        response = await call_next(request)
+        if timings:
+            response.headers["Server-Timing"] = format_server_timing(timings)
+        return response
+
+
+def create_codeforces_service(app: FastAPI):
+    return CodeForcesService(
+        app.state.session_pool,
+        app.state.concurrency_budget,
+        app.state.scrape_cache,
+        app.state.parse_executor,
+        app.state.summary_engine,
+    )
+
+
+async def get_codeforces_service(request: Request) -> CodeForcesService:
+    """Creates the service of a request, which checks sessions out of the pool for every page it fetches."""
+    return create_codeforces_service(request.app)
+
+
+async def to_ndjson(
+    records: AsyncIterator, fields: list[str] | None = None
+) -> AsyncIterator[bytes]:
+    async for record in records:
+        yield orjson.dumps(
+            record if fields is None else project(record, fields),
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+
+
+def parse_fields(fields: str | None, model: type[BaseModel]) -> list[str] | None:
+    """Parses a comma separated field selection of the model, in the order of the model fields."""
+    if fields is None:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - model.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return [field for field in model.model_fields if field in selected]
+
+
+def parse_cursor(cursor: str | None) -> int:
+    if cursor is None:
+        return 0
+    if not cursor.isdigit():
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    return int(cursor)
+
+
+def reject_paging(cursor: str | None, limit: int | None):
+    """Streams hold the whole listing, paging them would be silently ignored."""
+    if cursor is not None or limit is not None:
+        raise HTTPException(
+            status_code=422, detail="cursor and limit can't be used with stream"
+        )
+
+
+def encoded_response(
+    request: Request, encoded: EncodedResponse, headers: dict[str, str] | None = None
+) -> Response:
+    """Responds with the encoded body, compressed if the client accepts it, or with 304 if the client has it already."""
+    headers = {**(headers or {}), "ETag": encoded.etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or encoded.etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+    body, encoding = encoded.encode(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def list_response(
+    request: Request,
+    records: list,
+    fields: list[str] | None,
+    next_cursor: int | None,
+) -> Response:
+    """Responds with the records, only with the selected fields if any, and the cursor of the next page in the X-Next-Cursor header."""
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    # records are serialized as they are, the response model only documents them
+    data = (
+        records if fields is None else [project(record, fields) for record in records]
+    )
+    return encoded_response(request, EncodedResponse.of(dump_jsend(data)), headers)
 
 
 @app.exception_handler(httpx.ReadTimeout)
@@ -44,48 +330,309 @@ def health_check() -> JSendResponse[None]:
     return JSendResponse(message="OK", data=None)
 
 
+@app.get("/stats")
+def get_stats(request: Request) -> JSendResponse[dict[str, int | str]]:
+    """Returns runtime statistics of the service."""
+    parse_executor: ParseExecutor = request.app.state.parse_executor
+    return JSendResponse(
+        message="OK",
+        data={
+            "parse_executor": parse_executor.kind,
+            "parse_queue_depth": parse_executor.queue_depth,
+        },
+    )
+
+
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Exposes service metrics in the Prometheus text format."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/watched")
+def get_watched_gyms(request: Request) -> JSendResponse[list[int]]:
+    """Lists the gyms that are refreshed in the background."""
+    return JSendResponse(
+        message="OK", data=sorted(request.app.state.watch_registry.gym_ids)
+    )
+
+
+@app.put("/watched/{gym_id}")
+def watch_gym(gym_id: int, request: Request) -> JSendResponse[None]:
+    """Starts refreshing the gym in the background, so its requests are served from a warm cache."""
+    request.app.state.watch_registry.add(gym_id)
+    return JSendResponse(message="OK", data=None)
+
+
+@app.delete("/watched/{gym_id}")
+def unwatch_gym(gym_id: int, request: Request) -> JSendResponse[None]:
+    """Stops refreshing the gym in the background."""
+    request.app.state.watch_registry.remove(gym_id)
+    return JSendResponse(message="OK", data=None)
+
+
 @app.post("/contest/{gym_id}/summary")
 async def get_contest_summary(
-    gym_id: int, request: ContestSummaryRequest
+    gym_id: int,
+    request: ContestSummaryRequest,
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
 ) -> JSendResponse[ContestSummary]:
     """Retrieves a summary of a CodeForces contest with the specified gym ID.
 
     Note: Some contestants may be discarded based on virtual participation and deadline.
+    With targeted, only the standings pages of the handles are fetched, and the ranks are the
+    ones CodeForces shows instead of ranks among the kept contestants, so they can differ.
     """
     request.gym_id = gym_id
-    page_loader = PageLoader(configuration)
-    await page_loader.authenticate()
-    codeforces_service = CodeForcesService(page_loader)
     return JSendResponse(
         message="OK", data=await codeforces_service.get_contest_summary(request)
     )
 
 
+@app.post("/contests/summary")
+async def get_contest_summaries(
+    requests: list[ContestSummaryRequest],
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
+) -> JSendResponse[dict[int, GymSummaries]]:
+    """Retrieves summaries of many CodeForces contests in one call, keyed by gym ID.
+
+    Every request must set its gym_id. Each gym is scraped once however many requests refer to it,
+    and a gym that fails to load reports its error without failing the other gyms.
+    """
+    if any(request.gym_id < 0 for request in requests):
+        raise HTTPException(
+            status_code=422, detail="gym_id must be provided for every request"
+        )
+    return JSendResponse(
+        message="OK", data=await codeforces_service.get_contest_summaries(requests)
+    )
+
+
 @app.get("/contest/{gym_id}/submissions")
-async def get_contest_submissions(gym_id: int) -> JSendResponse[list[Submission]]:
-    page_loader = PageLoader(configuration)
-    await page_loader.authenticate()
-    codeforces_service = CodeForcesService(page_loader)
+async def get_contest_submissions(
+    gym_id: int,
+    request: Request,
+    stream: Literal["ndjson"] | None = None,
+    handle: list[str] | None = Query(None),
+    verdict: list[str] | None = Query(None),
+    problem: list[str] | None = Query(None),
+    virtual: bool | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    fields: str | None = None,
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
+) -> JSendResponse[list[Submission]]:
+    """Retrieves the submissions of a CodeForces contest with the specified gym ID.
+
+    Submissions can be filtered by handle, verdict (matched by its beginning, e.g. "Wrong answer"),
+    problem index and virtual participation, each filter may be repeated. With limit, a page of
+    submissions is returned and the X-Next-Cursor header holds the cursor of the next page.
+    fields selects a comma separated subset of the submission fields.
+
+    With stream=ndjson, submissions are streamed one JSON object per line as pages are scraped,
+    cursor and limit are rejected with it.
+    """
+    row_filter = SubmissionFilter(
+        handles=set(handle) if handle else None,
+        verdicts=tuple(verdict) if verdict else None,
+        problems=set(problem) if problem else None,
+        is_virtual=virtual,
+    )
+    selected_fields = parse_fields(fields, Submission)
+    if stream == "ndjson":
+        reject_paging(cursor, limit)
+        return StreamingResponse(
+            to_ndjson(
+                codeforces_service.iter_contest_submissions(
+                    gym_id, row_filter=row_filter
+                ),
+                selected_fields,
+            ),
+            media_type="application/x-ndjson",
+        )
+    if (
+        row_filter == SubmissionFilter()
+        and cursor is None
+        and limit is None
+        and fields is None
+    ):
+        # the whole listing is served from its cached encoding while it's unchanged
+        submissions = await codeforces_service.get_contest_submissions(gym_id)
+        return encoded_response(
+            request,
+            request.app.state.response_cache.get(gym_id, "submissions", submissions),
+        )
+    submissions, next_cursor = await codeforces_service.find_contest_submissions(
+        gym_id, row_filter, parse_cursor(cursor), limit
+    )
+    return list_response(request, submissions, selected_fields, next_cursor)
+
+
+@app.get("/contest/{gym_id}/standings/events")
+async def subscribe_contest_standings(
+    gym_id: int, request: Request
+) -> StreamingResponse:
+    """Streams the standings of the gym as server sent events.
+
+    The first event is a snapshot of the whole standings, the following ones carry only the rows
+    that changed, and are pushed as the gym is scraped again.
+    """
+    return StreamingResponse(
+        request.app.state.standings_feeds.subscribe(gym_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.put("/contest/{gym_id}/standings/webhooks")
+async def add_standings_webhook(
+    gym_id: int, url: str, request: Request
+) -> JSendResponse[None]:
+    """Posts the standings events of the gym to the url, until the webhook is removed or the service restarts."""
+    request.app.state.standings_feeds.add_webhook(gym_id, url)
+    return JSendResponse(message="OK", data=None)
+
+
+@app.delete("/contest/{gym_id}/standings/webhooks")
+async def remove_standings_webhook(
+    gym_id: int, url: str, request: Request
+) -> JSendResponse[None]:
+    """Stops posting the standings events of the gym to the url."""
+    request.app.state.standings_feeds.remove_webhook(gym_id, url)
+    return JSendResponse(message="OK", data=None)
+
+
+@app.get("/contest/{gym_id}/snapshot")
+async def export_contest_snapshot(
+    gym_id: int,
+    request: Request,
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
+) -> Response:
+    """Exports the problems, standings and submissions of the gym as a binary contest snapshot."""
+    problems, standings, submissions = await asyncio.gather(
+        codeforces_service.get_contest_problems(gym_id),
+        codeforces_service.get_contest_standings(gym_id),
+        codeforces_service.get_contest_submissions(gym_id),
+    )
+    snapshot = ContestSnapshot(
+        gym_id,
+        request.app.state.scrape_cache.is_finished(gym_id),
+        problems,
+        standings,
+        submissions,
+    )
+    return Response(
+        content=await asyncio.to_thread(write_snapshot, snapshot),
+        media_type="application/octet-stream",
+    )
+
+
+@app.put("/contest/{gym_id}/snapshot")
+async def import_contest_snapshot(gym_id: int, request: Request) -> JSendResponse[None]:
+    """Imports a contest snapshot of the gym into the cache, so the gym is served without scraping it."""
+    try:
+        snapshot = await asyncio.to_thread(read_snapshot, await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid snapshot: {e}")
+    if snapshot.gym_id != gym_id:
+        raise HTTPException(
+            status_code=422, detail=f"Snapshot is of gym {snapshot.gym_id}"
+        )
+    await import_snapshot(request.app.state.scrape_cache, snapshot)
+    return JSendResponse(message="OK", data=None)
+
+
+async def get_crawl_status(request: Request, gym_id: int, queued: int) -> CrawlStatus:
+    fetched, pending, failed = await request.app.state.submission_store.counts(gym_id)
+    return CrawlStatus(queued=queued, pending=pending, fetched=fetched, failed=failed)
+
+
+@app.post("/contest/{gym_id}/submission-details")
+async def crawl_submission_details(
+    gym_id: int,
+    request: Request,
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
+) -> JSendResponse[CrawlStatus]:
+    """Queues the accepted submissions of the gym for fetching their details in the background.
+
+    Submissions fetched before are not fetched again, so calling this again only fetches new ones.
+    """
+    submission_ids = await codeforces_service.get_accepted_submission_ids(gym_id)
+    queued = await request.app.state.submission_crawler.enqueue(gym_id, submission_ids)
+    return JSendResponse(
+        message="OK", data=await get_crawl_status(request, gym_id, queued)
+    )
+
+
+@app.get("/contest/{gym_id}/submission-details")
+async def get_submission_details(
+    gym_id: int, request: Request
+) -> JSendResponse[list[SubmissionDetail]]:
+    """Retrieves the submission details of the gym fetched so far."""
     return JSendResponse(
-        message="OK", data=await codeforces_service.get_contest_submissions(gym_id)
+        message="OK", data=await request.app.state.submission_store.get(gym_id)
     )
 
 
 @app.get("/contest/{gym_id}/problems")
-async def get_contest_problems(gym_id: int) -> JSendResponse[list[Problem]]:
-    page_loader = PageLoader(configuration)
-    await page_loader.authenticate()
-    codeforces_service = CodeForcesService(page_loader)
+async def get_contest_problems(
+    gym_id: int, codeforces_service: CodeForcesService = Depends(get_codeforces_service)
+) -> JSendResponse[list[Problem]]:
     return JSendResponse(
         message="OK", data=await codeforces_service.get_contest_problems(gym_id)
     )
 
 
 @app.get("/contest/{gym_id}/standings")
-async def get_contest_standings(gym_id: int) -> JSendResponse[list[Standing]]:
-    page_loader = PageLoader(configuration)
-    await page_loader.authenticate()
-    codeforces_service = CodeForcesService(page_loader)
-    return JSendResponse(
-        message="OK", data=await codeforces_service.get_contest_standings(gym_id)
+async def get_contest_standings(
+    gym_id: int,
+    request: Request,
+    stream: Literal["ndjson"] | None = None,
+    handle: list[str] | None = Query(None),
+    participation_type: list[ParticipationType] | None = Query(None),
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    fields: str | None = None,
+    codeforces_service: CodeForcesService = Depends(get_codeforces_service),
+) -> JSendResponse[list[Standing]]:
+    """Retrieves the standings of a CodeForces contest with the specified gym ID.
+
+    Standings can be filtered by handle and participation type, each filter may be repeated.
+    With limit, a page of standings is returned and the X-Next-Cursor header holds the cursor of
+    the next page. fields selects a comma separated subset of the standing fields.
+
+    With stream=ndjson, standings are streamed one JSON object per line as pages are scraped,
+    cursor and limit are rejected with it.
+    """
+    row_filter = StandingFilter(
+        handles=set(handle) if handle else None,
+        participation_types=set(participation_type) if participation_type else None,
+    )
+    selected_fields = parse_fields(fields, Standing)
+    if stream == "ndjson":
+        reject_paging(cursor, limit)
+        return StreamingResponse(
+            to_ndjson(
+                codeforces_service.iter_contest_standings(
+                    gym_id, row_filter=row_filter
+                ),
+                selected_fields,
+            ),
+            media_type="application/x-ndjson",
+        )
+    if (
+        row_filter == StandingFilter()
+        and cursor is None
+        and limit is None
+        and fields is None
+    ):
+        # the whole listing is served from its cached encoding while it's unchanged
+        standings = await codeforces_service.get_contest_standings(gym_id)
+        return encoded_response(
+            request,
+            request.app.state.response_cache.get(gym_id, "standings", standings),
+        )
+    standings, next_cursor = await codeforces_service.find_contest_standings(
+        gym_id, row_filter, parse_cursor(cursor), limit
     )
+    return list_response(request, standings, selected_fields, next_cursor)
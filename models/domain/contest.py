@@ -1,4 +1,3 @@
-import string
 from pydantic import BaseModel
 
 from models.domain.problem import Problem
@@ -7,7 +6,7 @@ from models.domain.submission import Submission
 
 
 class Contest(BaseModel):
-    gymId: string
+    gym_id: int
     submissions: list[Submission]
     problems: list[Problem]
     standings: list[Standing]
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class SubmissionDetail(BaseModel):
+    id: int
+    # Unix timestamp in utc time, to the second
+    submission_time_utc: int
+    source_code: str | None = None
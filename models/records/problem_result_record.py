@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+from models.domain.problem_result import ProblemResult
+
+
+@dataclass(slots=True)
+class ProblemResultRecord:
+    """
+    Compact in-memory counterpart of ProblemResult used inside the scrape pipeline.
+    """
+
+    tries: int
+    submission_id: int | None
+    submission_contest_minutes: int | None
+    is_accepted: bool
+    index: str
+
+    def to_model(self) -> ProblemResult:
+        return ProblemResult(
+            tries=self.tries,
+            submission_id=self.submission_id,
+            submission_contest_minutes=self.submission_contest_minutes,
+            is_accepted=self.is_accepted,
+            index=self.index,
+        )
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+from models.domain.standing import ParticipationType, Standing
+from models.records.problem_result_record import ProblemResultRecord
+
+
+@dataclass(slots=True)
+class StandingRecord:
+    """
+    Compact in-memory counterpart of Standing used inside the scrape pipeline.
+    """
+
+    solved: int
+    rank: int | None
+    handle: str
+    penalty: int
+    problem_results: list[ProblemResultRecord]
+    participation_type: ParticipationType
+
+    def to_model(self) -> Standing:
+        return Standing(
+            solved=self.solved,
+            rank=self.rank,
+            handle=self.handle,
+            penalty=self.penalty,
+            problem_results=[result.to_model() for result in self.problem_results],
+            participation_type=self.participation_type,
+        )
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+from models.domain.submission import Submission
+
+
+@dataclass(slots=True)
+class SubmissionRecord:
+    """
+    Compact in-memory counterpart of Submission used inside the scrape pipeline.
+    Handles, languages and verdicts are interned by the parser, so records of the
+    same contest share their strings.
+    """
+
+    id: int
+    # Unix timestamp in utc time
+    submission_time_utc: int
+    handle: str
+    is_virtual: bool
+    problem_index: str
+    language: str
+    verdict: str
+    # in milliseconds
+    time: int
+    # in KB
+    memory: int
+
+    def to_model(self) -> Submission:
+        return Submission(
+            id=self.id,
+            submission_time_utc=self.submission_time_utc,
+            handle=self.handle,
+            is_virtual=self.is_virtual,
+            problem_index=self.problem_index,
+            language=self.language,
+            verdict=self.verdict,
+            time=self.time,
+            memory=self.memory,
+        )
@@ -8,6 +8,10 @@ class ContestSummaryRequest(BaseModel):
     virtual_enabled: bool
     virtual_deadline_utc: int | None
     handles: list[str]
+    # fetch only the standings pages of the requested handles. Ranks are then the
+    # ones codeforces shows, which also count the participants a full summary drops
+    # (virtual ones, or ones past the virtual deadline), so they can be higher.
+    targeted: bool = False
 
     @model_validator(mode="after")
     def virtual_deadline_utc__provided(cls, m: "ContestSummaryRequest"):
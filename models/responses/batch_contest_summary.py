@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+from models.responses.contest_summary import ContestSummary
+
+
+class GymSummaries(BaseModel):
+    # summaries in the order the gym's requests were given, None if the gym failed
+    summaries: list[ContestSummary] | None
+    error: str | None = None
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class CrawlStatus(BaseModel):
+    # submissions queued by this call that weren't queued or fetched before
+    queued: int
+    pending: int
+    fetched: int
+    # failed more than the crawler retries them
+    failed: int
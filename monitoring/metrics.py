@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+FETCH_SECONDS = Histogram(
+    "codeforces_fetch_seconds",
+    "Time spent fetching a page from codeforces, per attempt.",
+    ["kind"],
+)
+FETCH_BYTES = Counter(
+    "codeforces_fetch_bytes_total", "Bytes of page bodies fetched.", ["kind"]
+)
+FETCH_RESPONSES = Counter(
+    "codeforces_fetch_responses_total",
+    "Upstream responses by status code.",
+    ["kind", "status_code"],
+)
+FETCH_RETRIES = Counter(
+    "codeforces_fetch_retries_total", "Upstream fetches that were retried.", ["kind"]
+)
+AUTHENTICATIONS = Counter("codeforces_authentications_total", "Logins to codeforces.")
+ACCOUNT_QUARANTINES = Counter(
+    "codeforces_account_quarantines_total",
+    "Accounts taken out of rotation for a while.",
+    ["reason"],
+)
+
+PARSE_SECONDS = Histogram(
+    "codeforces_parse_seconds", "Time spent parsing a page.", ["parser"]
+)
+PARSED_ROWS = Counter(
+    "codeforces_parsed_rows_total", "Rows parsed from pages.", ["parser"]
+)
+PARSE_MEMO_HITS = Counter(
+    "codeforces_parse_memo_hits_total",
+    "Pages not parsed again because they were unchanged.",
+    ["parser"],
+)
+PARSE_QUEUE_DEPTH = Gauge("codeforces_parse_queue_depth", "Pages waiting to be parsed.")
+
+PHASE_SECONDS = Histogram(
+    "codeforces_service_phase_seconds",
+    "End to end time of service phases.",
+    ["phase"],
+)
+
+# phase timings of the current request, set only when Server-Timing is enabled
+server_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "server_timings", default=None
+)
+
+
+def url_kind(path: str) -> str:
+    """
+    Returns a low cardinality name for a codeforces url path, used as a label.
+    """
+    if path.startswith("/enter"):
+        return "enter"
+    if "/standings" in path:
+        return "standings"
+    if "/status" in path:
+        return "status"
+    if "/submission/" in path:
+        return "submission"
+    return "gym"
+
+
+@contextmanager
+def observe_phase(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.labels(phase).observe(elapsed)
+        timings = server_timings.get()
+        if timings is not None:
+            timings.append((phase, elapsed))
+
+
+def format_server_timing(timings: list[tuple[str, float]]) -> str:
+    return ", ".join(f"{phase};dur={elapsed * 1000:.1f}" for phase, elapsed in timings)
@@ -0,0 +1,55 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+from monitoring.metrics import ACCOUNT_QUARANTINES
+from scraper.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Account:
+    """
+    Account is a codeforces login shared by the sessions that use it. Every account
+    has its own rate limit, and an account that gets logged out or throttled is
+    quarantined for a while, so the session pool prefers the other accounts.
+    """
+
+    handle_or_email: str
+    password: str
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    # sessions of the account checked out right now
+    load: int = 0
+    # time.monotonic() until which the account is quarantined
+    quarantined_until: float = 0
+    # quarantines in a row, the quarantine doubles with each of them
+    quarantines: int = 0
+    # seconds
+    quarantine_base: float = 30
+    quarantine_max: float = 15 * 60
+
+    @property
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.quarantined_until
+
+    def quarantine(self, reason: str):
+        if not self.is_healthy:
+            # sessions in use keep reporting the same trouble, it counts once
+            return
+        duration = min(
+            self.quarantine_max, self.quarantine_base * 2**self.quarantines
+        )
+        self.quarantines += 1
+        self.quarantined_until = time.monotonic() + duration
+        ACCOUNT_QUARANTINES.labels(reason).inc()
+        logger.warning(
+            "Account %s %s, quarantined for %.0f seconds",
+            self.handle_or_email,
+            reason,
+            duration,
+        )
+
+    def on_success(self):
+        if self.is_healthy:
+            self.quarantines = 0
@@ -1,68 +1,281 @@
+import asyncio
+import email.utils
+import logging
+import random
 import string
-from bs4 import BeautifulSoup
+import time
+from bs4 import SoupStrainer
 import pickle
 import httpx
 
+from monitoring.metrics import (
+    AUTHENTICATIONS,
+    FETCH_BYTES,
+    FETCH_RESPONSES,
+    FETCH_RETRIES,
+    FETCH_SECONDS,
+    url_kind,
+)
+from scraper.account import Account
+from scraper.page_store import PageStore
+from scraper.rate_limiter import RateLimiter
+from scraper.soup import make_soup
+from scraper.standing_page_parser import is_showing_unofficial
+
+logger = logging.getLogger(__name__)
+
+# responses that mean upstream is overloaded or throttling us, worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLING_STATUS_CODES = {429, 503}
+
+
+def retry_after_seconds(value: str) -> float | None:
+    """Parses a Retry-After header, given either in seconds or as an http date."""
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
 
 class PageLoader:
     """
     Page loader is a class we use to load web pages.
     """
 
-    def __init__(self, configuration) -> None:
-        self.async_session = httpx.AsyncClient(follow_redirects=True, timeout=10)
+    def __init__(
+        self,
+        configuration,
+        rate_limiter: RateLimiter | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        page_store: PageStore | None = None,
+        account: Account | None = None,
+    ) -> None:
+        limits = httpx.Limits(
+            max_connections=configuration.get("maxConnections", 20),
+            max_keepalive_connections=configuration.get("maxKeepaliveConnections", 10),
+            keepalive_expiry=configuration.get("keepaliveExpiry", 30),
+        )
+        # transport is only given to replay pages, e.g. in benchmarks. httpx asks for
+        # gzip and, with the brotli package installed, br compressed bodies.
+        self.async_session = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=10,
+            http2=True,
+            limits=limits,
+            transport=transport,
+        )
         self.async_session.cookies.update({"__hs_opt_out": "no"})
 
-        self.handle_or_email = configuration["handleOrEmail"]
-        self.password = configuration["password"]
+        # sessions of the same account share it, and with it the rate limit
+        self.account = account or Account(
+            configuration["handleOrEmail"],
+            configuration["password"],
+            rate_limiter or RateLimiter(),
+        )
+        # Codeforces login cookies are long lived, but we re-login after this many seconds
+        # to avoid using a session that expires in the middle of a scrape
+        self.session_max_age: float = configuration.get("sessionMaxAge", 6 * 60 * 60)
+        self.authenticated_at: float | None = None
+        # show unofficial standings state we have set for this session, per gym
+        self.show_unofficial: dict[int, bool] = {}
+        self.show_unofficial_locks: dict[int, asyncio.Lock] = {}
+
+        self.rate_limiter = self.account.rate_limiter
+        self.page_store = page_store or PageStore(
+            configuration.get("pageStoreEntries", 512)
+        )
+        self.max_retries: int = configuration.get("maxRetries", 4)
+        # seconds, the backoff doubles on every retry up to retryBackoffMax
+        self.retry_backoff: float = configuration.get("retryBackoff", 0.5)
+        self.retry_backoff_max: float = configuration.get("retryBackoffMax", 10)
+
+    @property
+    def is_authenticated(self) -> bool:
+        return (
+            self.authenticated_at is not None
+            and time.monotonic() - self.authenticated_at < self.session_max_age
+        )
 
     async def authenticate(self):
-        login = await self.async_session.get("https://codeforces.com/enter")
-        ss = BeautifulSoup(login.text, features="html.parser")
+        login = await self.send("GET", "https://codeforces.com/enter")
+        ss = make_soup(login.text, SoupStrainer("input", attrs={"name": "csrf_token"}))
         csrf_token = ss.find("input", {"name": "csrf_token"})["value"]
 
         payload = {
-            "handleOrEmail": self.handle_or_email,
+            "handleOrEmail": self.account.handle_or_email,
             "action": "enter",
-            "password": self.password,
+            "password": self.account.password,
             "csrf_token": csrf_token,
         }
 
-        print("Authenticating")
-        res = await self.async_session.post(
-            "https://codeforces.com/enter", data=payload
-        )
+        logger.info("Authenticating")
+        AUTHENTICATIONS.inc()
+        res = await self.send("POST", "https://codeforces.com/enter", data=payload)
         res.raise_for_status()
-        print("Authentication Complete")
+        if "logout" not in res.text:
+            # wrong password, or the account is locked
+            self.account.quarantine("failed to log in")
+            raise RuntimeError(f"Logging in as {self.account.handle_or_email} failed")
+        self.authenticated_at = time.monotonic()
+        # a new login may come with default standings settings
+        self.show_unofficial.clear()
+        logger.info("Authentication Complete")
+
+    async def ensure_authenticated(self):
+        if not self.is_authenticated:
+            await self.authenticate()
+
+    async def close(self):
+        await self.async_session.aclose()
+
+    @staticmethod
+    def is_logged_out(response: httpx.Response) -> bool:
+        # Codeforces redirects anonymous users to the login page, and every page
+        # rendered for a logged in user has a logout link in the header. Error pages,
+        # e.g. overload responses left after retrying, say nothing about the session.
+        if response.url.path.startswith("/enter"):
+            return True
+        return response.is_success and "logout" not in response.text
+
+    async def send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request within the upstream rate limit. Timeouts, connection errors
+        and overload responses are retried with jittered exponential backoff, or
+        after the Retry-After of the response. A Retry-After longer than the longest
+        backoff isn't waited for, the response is returned as it is.
+        """
+        parsed_url = httpx.URL(url)
+        bucket = self.rate_limiter.bucket(parsed_url.host)
+        kind = url_kind(parsed_url.path)
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = await self.async_session.request(method, url, **kwargs)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                FETCH_RESPONSES.labels(kind, type(e).__name__).inc()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("%s %s failed with %r, retrying", method, url, e)
+                FETCH_RETRIES.labels(kind).inc()
+                bucket.on_throttled()
+                await asyncio.sleep(self.__backoff(attempt))
+                continue
+            finally:
+                FETCH_SECONDS.labels(kind).observe(time.perf_counter() - start)
+
+            FETCH_RESPONSES.labels(kind, str(response.status_code)).inc()
+            FETCH_BYTES.labels(kind).inc(len(response.content))
+
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or attempt == self.max_retries
+            ):
+                bucket.on_success()
+                return response
+
+            logger.warning(
+                "%s %s returned %d, retrying", method, url, response.status_code
+            )
+            FETCH_RETRIES.labels(kind).inc()
+            if response.status_code in THROTTLING_STATUS_CODES:
+                bucket.on_throttled()
+                self.account.quarantine("was throttled")
+            retry_after = retry_after_seconds(response.headers.get("retry-after", ""))
+            if retry_after is not None and retry_after > self.retry_backoff_max:
+                # waiting that long would hold the concurrency slot of the page with it
+                logger.warning(
+                    "%s %s asks to retry after %.0f s, giving up",
+                    method,
+                    url,
+                    retry_after,
+                )
+                return response
+            await asyncio.sleep(
+                retry_after if retry_after is not None else self.__backoff(attempt)
+            )
+
+    def __backoff(self, attempt: int) -> float:
+        # full jitter keeps retries of concurrent page fetches from lining up
+        return random.uniform(
+            0, min(self.retry_backoff_max, self.retry_backoff * 2**attempt)
+        )
+
+    async def get(self, url: str) -> str:
+        """
+        Loads the url with an authenticated session, logging in again if codeforces
+        has dropped the session. Pages loaded before are revalidated with a conditional
+        request, and the stored body is reused when codeforces answers 304.
+        """
+        await self.ensure_authenticated()
+        data = await self.send(
+            "GET", url, headers=self.page_store.conditional_headers(url)
+        )
+
+        if data.status_code == 304:
+            stored = self.page_store.get(url)
+            if stored is not None:
+                return stored.text
+            # the stored page was evicted in the meantime
+            data = await self.send("GET", url)
+
+        if self.is_logged_out(data):
+            logger.info("Session logged out, re-authenticating")
+            self.account.quarantine("was logged out")
+            await self.authenticate()
+            data = await self.send("GET", url)
+
+        data.raise_for_status()
+        self.account.on_success()
+        self.page_store.put(url, data)
+        return data.text
 
     async def get_standings_page(
         self, gym_id, page: int = 1, show_unofficial: bool = True
     ):
         url = f"https://codeforces.com/gym/{gym_id}/standings/page/{page}"
+
+        if self.show_unofficial.get(gym_id) != show_unofficial:
+            async with self.show_unofficial_locks.setdefault(gym_id, asyncio.Lock()):
+                # pages requested concurrently wait for the first one to toggle
+                if self.show_unofficial.get(gym_id) != show_unofficial:
+                    await self.__toggle_show_unofficial(url, gym_id, show_unofficial)
+
+        page = await self.get(url)
+
+        # the toggle is stored by codeforces, so it could have been changed by another
+        # login of the same account. The page tells us which state it was rendered with.
+        if is_showing_unofficial(page) not in (None, show_unofficial):
+            logger.info("Show unofficial was reset for gym %s, toggling again", gym_id)
+            await self.__toggle_show_unofficial(url, gym_id, show_unofficial)
+            page = await self.get(url)
+
+        return page
+
+    async def __toggle_show_unofficial(self, url: str, gym_id, show_unofficial: bool):
         payload = {
             "newShowUnofficialValue": show_unofficial,
             "action": "toggleShowUnofficial",
         }
 
-        await self.async_session.post(url, data=payload)
-        data = await self.async_session.get(url)
-        data.raise_for_status()
-        return data.text
+        await self.ensure_authenticated()
+        await self.send("POST", url, data=payload)
+        self.show_unofficial[gym_id] = show_unofficial
+        # stored pages may have been rendered with the other setting
+        self.page_store.forget_prefix(f"https://codeforces.com/gym/{gym_id}/standings/")
 
     async def get_gym_page(self, gym_id: int) -> string:
         url = f"https://codeforces.com/gym/{gym_id}"
-        data = await self.async_session.get(url)
-        data.raise_for_status()
-        return data.text
+        return await self.get(url)
 
     async def get_submission_page(self, gym_id, submission_id):
         url = f"https://codeforces.com/gym/{gym_id}/submission/{submission_id}"
-        data = await self.async_session.get(url)
-        data.raise_for_status()
-        return data.text
+        return await self.get(url)
 
     async def get_status_page(self, gym_id, page_index):
         url = f"https://codeforces.com/gym/{gym_id}/status?pageIndex={page_index}&order=BY_JUDGED_DESC"
-        data = await self.async_session.get(url)
-        data.raise_for_status()
-        return data.text
+        return await self.get(url)
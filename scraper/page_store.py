@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass(slots=True)
+class StoredPage:
+    text: str
+    etag: str | None
+    last_modified: str | None
+
+
+class PageStore:
+    """
+    Page store remembers the last body of pages fetched along with their ETag and
+    Last-Modified validators, so they can be fetched again with a conditional request
+    and a 304 Not Modified reuses the stored body. Only pages that came with a
+    validator are stored, in an LRU of max_entries pages shared by every session.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.pages: OrderedDict[str, StoredPage] = OrderedDict()
+
+    def get(self, url: str) -> StoredPage | None:
+        page = self.pages.get(url)
+        if page is not None:
+            self.pages.move_to_end(url)
+        return page
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        page = self.pages.get(url)
+        if page is None:
+            return {}
+        headers = {}
+        if page.etag is not None:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified is not None:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def put(self, url: str, response: httpx.Response):
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag is None and last_modified is None:
+            # nothing to revalidate with, the page would only take up memory
+            self.pages.pop(url, None)
+            return
+
+        self.pages[url] = StoredPage(response.text, etag, last_modified)
+        self.pages.move_to_end(url)
+        while len(self.pages) > self.max_entries:
+            self.pages.popitem(last=False)
+
+    def forget_prefix(self, prefix: str):
+        for url in [url for url in self.pages if url.startswith(prefix)]:
+            del self.pages[url]
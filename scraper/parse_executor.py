@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, TypeVar
+
+from monitoring.metrics import (
+    PARSE_MEMO_HITS,
+    PARSE_QUEUE_DEPTH,
+    PARSE_SECONDS,
+    PARSED_ROWS,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def timed_parse(parser: Callable[[str], T], page: str) -> tuple[T, float]:
+    """
+    Runs the parser and returns its result along with the time it took, measured in
+    the worker so it excludes the time the page waited in the queue.
+    """
+    start = time.perf_counter()
+    result = parser(page)
+    return result, time.perf_counter() - start
+
+
+def count_rows(result) -> int:
+    # parsers return their rows, or their rows along with extra page information,
+    # or a single item for pages of one item, e.g. a submission
+    rows = result[0] if isinstance(result, tuple) else result
+    return len(rows) if isinstance(rows, list) else 1
+
+
+class ParseExecutor:
+    """
+    Parse executor runs page parsers away from the event loop, so the loop keeps
+    downloading pages and answering requests while pages are being parsed.
+
+    kind is one of "process" (parse on all cores), "thread" (parsers release the
+    loop but share the GIL) or "inline" (parse on the event loop).
+
+    Results of the last memo_entries pages are remembered by the hash of the page,
+    so a page that hasn't changed since it was last parsed isn't parsed again.
+    Parsed rows are shared between callers and must not be modified.
+    """
+
+    def __init__(
+        self, kind: str = "process", workers: int | None = None, memo_entries: int = 256
+    ) -> None:
+        self.kind = kind
+        self.workers = workers
+        self.memo_entries = memo_entries
+        self.memo: OrderedDict[tuple[str, bytes], object] = OrderedDict()
+        # number of pages submitted for parsing that haven't been parsed yet
+        self.queue_depth = 0
+        self.executor: Executor | None = None
+
+        if kind == "process":
+            try:
+                self.executor = ProcessPoolExecutor(max_workers=workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning("Process pool unavailable (%s), parsing in threads", e)
+                self.kind = "thread"
+
+        if self.kind == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        elif self.kind not in ("process", "inline"):
+            raise ValueError(f"Unknown parse executor kind: {kind}")
+
+    async def run(self, parser: Callable[[str], T], page: str) -> T:
+        key = (parser.__name__, hashlib.blake2b(page.encode()).digest())
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            PARSE_MEMO_HITS.labels(parser.__name__).inc()
+            return self.memo[key]
+
+        if self.executor is None:
+            result, elapsed = timed_parse(parser, page)
+        else:
+            self.queue_depth += 1
+            PARSE_QUEUE_DEPTH.inc()
+            executor = self.executor
+            try:
+                loop = asyncio.get_running_loop()
+                result, elapsed = await loop.run_in_executor(
+                    executor, timed_parse, parser, page
+                )
+            except BrokenProcessPool:
+                # a crashed worker shouldn't fail the scrape, the page is parsed here instead
+                self.__replace_broken_pool(executor)
+                result, elapsed = timed_parse(parser, page)
+            finally:
+                self.queue_depth -= 1
+                PARSE_QUEUE_DEPTH.dec()
+
+        PARSE_SECONDS.labels(parser.__name__).observe(elapsed)
+        PARSED_ROWS.labels(parser.__name__).inc(count_rows(result))
+
+        if self.memo_entries:
+            self.memo[key] = result
+            while len(self.memo) > self.memo_entries:
+                self.memo.popitem(last=False)
+        return result
+
+    def __replace_broken_pool(self, broken: Executor):
+        # pages that were waiting on the broken pool all fail, it is replaced once
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.warning("Parse worker died, the process pool was recreated")
+        except (OSError, NotImplementedError) as e:
+            logger.warning("Parse worker died (%s), parsing inline from now on", e)
+            self.executor = None
+            self.kind = "inline"
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,41 @@
+import logging
 from typing import Iterable
 from bs4 import BeautifulSoup, Tag
 from models.domain.problem import Problem
+from scraper.soup import elements, make_soup
+
+logger = logging.getLogger(__name__)
+
+# the problems table and the contest phase are the only parts of the page we read
+GYM_PAGE_TARGETS = elements(("table", "problems"), ("span", "contest-state-phase"))
 
 
 def parse_problems(page: str) -> list[Problem]:
     """
     Parses the contest problems page and returns the problems.
     """
-    print("Parsing problems")
-    soup = BeautifulSoup(page, "html.parser")
+    return parse_problems_soup(make_soup(page, GYM_PAGE_TARGETS))
+
+
+def parse_gym_page(page: str) -> tuple[list[Problem], bool]:
+    """
+    Parses the gym page once and returns the problems along with whether the
+    contest is over.
+    """
+    soup = make_soup(page, GYM_PAGE_TARGETS)
+    return parse_problems_soup(soup), is_contest_finished(soup)
+
+
+def is_contest_finished(soup: BeautifulSoup) -> bool:
+    # the contest sidebar shows the phase of the contest, e.g. "Running" or "Finished"
+    phase = soup.find("span", class_="contest-state-phase")
+    if phase is None:
+        return False
+    return phase.text.strip().lower() in ("finished", "final standings")
+
+
+def parse_problems_soup(soup: BeautifulSoup) -> list[Problem]:
+    logger.debug("Parsing problems")
     problems_table = soup.find("table", class_="problems")
 
     if problems_table is None:
@@ -37,5 +64,5 @@ def parse_problems(page: str) -> list[Problem]:
             )
         )
 
-    print("Parsing problems complete")
+    logger.debug("Parsing problems complete")
     return problems
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket with an adaptive rate. The rate grows additively while requests
+    succeed and is halved when upstream starts throttling (AIMD).
+    """
+
+    def __init__(
+        self, rate: float, burst: int, min_rate: float, max_rate: float
+    ) -> None:
+        # requests per second
+        self.rate = rate
+        self.capacity = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens: float = burst
+        self.updated_at = time.monotonic()
+        self.decreased_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_throttled(self):
+        now = time.monotonic()
+        # a burst of throttled responses to requests sent at the same rate counts once
+        if now - self.decreased_at < 1:
+            return
+        self.decreased_at = now
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+        logger.warning(
+            "Upstream is throttling, rate lowered to %.2f requests/s", self.rate
+        )
+
+
+class RateLimiter:
+    """
+    Rate limiter keeps one token bucket per host, shared by every page loader of
+    the process.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10,
+        burst: int = 10,
+        min_rate: float = 1,
+        max_rate: float = 20,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(
+                self.rate, self.burst, self.min_rate, self.max_rate
+            )
+        return self.buckets[host]
@@ -0,0 +1,52 @@
+import datetime
+import re
+import sys
+from functools import lru_cache
+
+import pytz
+
+# codeforces shows times in utc + 3, regardless of the machine's timezone
+MOSCOW = pytz.timezone("Europe/Moscow")
+DIGITS = re.compile(r"\d+")
+
+
+def moscow_to_utc(when: datetime.datetime) -> int:
+    """
+    Converts a naive time shown by codeforces to a unix timestamp.
+    """
+    return int(MOSCOW.localize(when).astimezone(pytz.utc).timestamp())
+
+
+@lru_cache(maxsize=8192)
+def moscow_minute_to_utc(when: str) -> int:
+    """
+    Converts a status page time, e.g. "Jul/25/2023 14:20", to a unix timestamp.
+    Submissions of a contest fall into few distinct minutes, so conversions are
+    memoized.
+    """
+    return moscow_to_utc(datetime.datetime.strptime(when, "%b/%d/%Y %H:%M"))
+
+
+@lru_cache(maxsize=1024)
+def contest_minutes(time: str) -> int:
+    """
+    Converts a standings time since the contest start, e.g. "1:05", to minutes.
+    """
+    hours, minutes = time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_digits(text: str) -> int:
+    """
+    Returns the number made of the digits in the text, e.g. 46 for "46 ms".
+    """
+    return int("".join(DIGITS.findall(text)))
+
+
+def last_path_segment(href: str) -> str:
+    return sys.intern(href.rsplit("/", 1)[-1].strip())
+
+
+def handle_from_href(href: str) -> str:
+    # handles are matched case insensitively, and repeat across rows and pages
+    return sys.intern(href.rsplit("/", 1)[-1].strip().lower())
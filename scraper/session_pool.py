@@ -0,0 +1,100 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from scraper.account import Account
+from scraper.page_loader import PageLoader
+from scraper.page_store import PageStore
+from scraper.rate_limiter import RateLimiter
+
+
+class SessionPool:
+    """
+    Session pool keeps a fixed number of long-lived page loaders for the lifetime
+    of the application. Every page fetch checks a loader out, uses it and returns
+    it, so the login and the underlying connections are reused across requests.
+
+    With several accounts configured, every account gets size sessions and its own
+    rate limit. Checkouts go to the healthy account with the fewest sessions in use,
+    quarantined accounts are only used when every account is quarantined. Since the
+    pages of one scrape are fetched one checkout each, they are spread over all the
+    accounts and a scrape gets faster with every account added.
+    """
+
+    def __init__(self, configuration, size: int = 4) -> None:
+        credentials = configuration.get("credentials") or [
+            (configuration["handleOrEmail"], configuration["password"])
+        ]
+        self.accounts: list[Account] = [
+            Account(
+                handle_or_email, password, self.__create_rate_limiter(configuration)
+            )
+            for handle_or_email, password in credentials
+        ]
+        # pages fetched by any session are revalidated by the others
+        self.page_store = PageStore(configuration.get("pageStoreEntries", 512))
+        self.sessions: list[PageLoader] = [
+            PageLoader(configuration, page_store=self.page_store, account=account)
+            for account in self.accounts
+            for _ in range(size)
+        ]
+        self.idle: list[PageLoader] = list(self.sessions)
+        self.released = asyncio.Condition()
+
+    @staticmethod
+    def __create_rate_limiter(configuration) -> RateLimiter:
+        # every session of an account shares one rate limiter, so the limit holds
+        # per account across the process
+        return RateLimiter(
+            rate=configuration.get("rateLimit", 10),
+            burst=configuration.get("rateLimitBurst", 10),
+            min_rate=configuration.get("rateLimitMin", 1),
+            max_rate=configuration.get("rateLimitMax", 20),
+        )
+
+    def __pick(self) -> PageLoader | None:
+        healthy = [session for session in self.idle if session.account.is_healthy]
+        if healthy:
+            return min(healthy, key=lambda session: session.account.load)
+        if any(account.is_healthy for account in self.accounts) or not self.idle:
+            # a healthy account is busy, wait for one of its sessions
+            return None
+        # every account is quarantined, use the one that is released first
+        return min(self.idle, key=lambda session: session.account.quarantined_until)
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[PageLoader]:
+        async with self.released:
+            page_loader = await self.released.wait_for(self.__pick)
+            self.idle.remove(page_loader)
+        page_loader.account.load += 1
+        try:
+            # sessions are authenticated lazily, and again once their login gets old
+            await page_loader.ensure_authenticated()
+            yield page_loader
+        finally:
+            page_loader.account.load -= 1
+            async with self.released:
+                self.idle.append(page_loader)
+                self.released.notify_all()
+
+    async def get_gym_page(self, gym_id: int) -> str:
+        async with self.checkout() as page_loader:
+            return await page_loader.get_gym_page(gym_id)
+
+    async def get_standings_page(
+        self, gym_id: int, page: int = 1, show_unofficial: bool = True
+    ) -> str:
+        async with self.checkout() as page_loader:
+            return await page_loader.get_standings_page(gym_id, page, show_unofficial)
+
+    async def get_status_page(self, gym_id: int, page_index: int) -> str:
+        async with self.checkout() as page_loader:
+            return await page_loader.get_status_page(gym_id, page_index)
+
+    async def get_submission_page(self, gym_id: int, submission_id: int) -> str:
+        async with self.checkout() as page_loader:
+            return await page_loader.get_submission_page(gym_id, submission_id)
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self.sessions))
@@ -0,0 +1,38 @@
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+
+    DEFAULT_PARSER_BACKEND = "lxml"
+except ImportError:
+    DEFAULT_PARSER_BACKEND = "html.parser"
+
+# Any tree builder supported by BeautifulSoup that honours parse_only, e.g. "lxml"
+# or "html.parser". Read from the environment so parser worker processes agree
+# with the web process.
+PARSER_BACKEND = os.getenv("CODEFORCES_PARSER_BACKEND", DEFAULT_PARSER_BACKEND)
+
+
+def has_class(attrs, class_name: str) -> bool:
+    classes = attrs.get("class") or ""
+    if isinstance(classes, str):
+        classes = classes.split()
+    return class_name in classes
+
+
+def elements(*targets: tuple[str, str]) -> SoupStrainer:
+    """
+    Returns a strainer matching elements by (tag name, css class). Only the matching
+    elements and their children are materialized when the page is parsed.
+    """
+    return SoupStrainer(
+        lambda name, attrs: any(
+            name == tag and has_class(attrs, class_name) for tag, class_name in targets
+        )
+    )
+
+
+def make_soup(page: str, targets: SoupStrainer | None = None) -> BeautifulSoup:
+    return BeautifulSoup(page, PARSER_BACKEND, parse_only=targets)
@@ -1,8 +1,21 @@
 import datetime
+import logging
+import re
 from bs4 import BeautifulSoup
 
-from models.domain.problem_result import ProblemResult
-from models.domain.standing import ParticipationType, Standing
+from scraper.row_decoding import contest_minutes, handle_from_href
+from scraper.soup import elements, make_soup
+
+from models.domain.standing import ParticipationType
+from models.records.problem_result_record import ProblemResultRecord
+from models.records.standing_record import StandingRecord
+
+logger = logging.getLogger(__name__)
+
+# the standings table and the pagination are the only parts of the page we read
+STANDINGS_PAGE_TARGETS = elements(
+    ("table", "standings"), ("div", "custom-links-pagination")
+)
 
 
 def get_submission_time(page: str) -> int:
@@ -12,8 +25,25 @@ def get_submission_time(page: str) -> int:
     return int(datetime.datetime.strptime(time, "%Y-%m-%d %H:%M:%S").timestamp())
 
 
+SHOW_UNOFFICIAL_CHECKBOX = re.compile(r'<input[^>]*id="showUnofficial"[^>]*>')
+
+
+def is_showing_unofficial(page: str) -> bool | None:
+    """
+    Returns whether the standings page was rendered with unofficial participants,
+    or None if the page has no show unofficial checkbox.
+    """
+    checkbox = SHOW_UNOFFICIAL_CHECKBOX.search(page)
+    if checkbox is None:
+        return None
+    return "checked" in checkbox.group(0)
+
+
 def get_page_count(page: str) -> int:
-    soup = BeautifulSoup(page, "html.parser")
+    return count_pages(make_soup(page, STANDINGS_PAGE_TARGETS))
+
+
+def count_pages(soup: BeautifulSoup) -> int:
     pagination_div = soup.find("div", class_="custom-links-pagination")
 
     if pagination_div is None:
@@ -23,12 +53,24 @@ def get_page_count(page: str) -> int:
     return pages_count
 
 
-def parse_standings(page: str) -> list[Standing]:
+def parse_standings(page: str) -> list[StandingRecord]:
     """
     Parses the contest standings page and returns the contest standings.
     """
-    print("Parsing standings page")
-    soup = BeautifulSoup(page, "html.parser")
+    return parse_standings_soup(make_soup(page, STANDINGS_PAGE_TARGETS))
+
+
+def parse_standings_with_page_count(page: str) -> tuple[list[StandingRecord], int]:
+    """
+    Parses the first standings page once and returns its standings along with the
+    number of standings pages.
+    """
+    soup = make_soup(page, STANDINGS_PAGE_TARGETS)
+    return parse_standings_soup(soup), count_pages(soup)
+
+
+def parse_standings_soup(soup: BeautifulSoup) -> list[StandingRecord]:
+    logger.debug("Parsing standings page")
     standings_table = soup.find("table", class_="standings")
 
     if standings_table is None:
@@ -36,14 +78,14 @@ def parse_standings(page: str) -> list[Standing]:
 
     # four extra columns: rank, handle, solved, penalty
     problems_count = len(standings_table.find("tr", recursive=True).find_all("th")) - 4
-    result: list[Standing] = []
+    result: list[StandingRecord] = []
 
     for row in standings_table.find_all("tr", {"participantid": True}):
         # column order: rank, handle, solved, penalty, problem1, problem2, ...
         cells = row.find_all("td", recursive=False)
 
         rank = cells[0].string.strip()
-        handle = cells[1].find("a")["href"].split("/")[-1].strip().lower()
+        handle = handle_from_href(cells[1].find("a")["href"])
         solved = cells[2].string.strip()
         solved = int(solved) if solved else 0
         penalty = cells[3].string.strip()
@@ -65,7 +107,7 @@ def parse_standings(page: str) -> list[Standing]:
             rank = None
 
         result.append(
-            Standing(
+            StandingRecord(
                 solved=solved,
                 rank=rank,
                 handle=handle,
@@ -75,11 +117,11 @@ def parse_standings(page: str) -> list[Standing]:
             )
         )
 
-    print("Parsing standings page complete")
+    logger.debug("Parsing standings page complete")
     return result
 
 
-def parse_problem_cells(problem_cells, problems_count) -> list[ProblemResult]:
+def parse_problem_cells(problem_cells, problems_count) -> list[ProblemResultRecord]:
     """
     Parses the entries and stores the results in the "results" dictionary.
     It also stores the rank, number of solved problems and problem stats.
@@ -87,7 +129,7 @@ def parse_problem_cells(problem_cells, problems_count) -> list[ProblemResult]:
     return [parse_problem_cell(problem_cells[i], i) for i in range(problems_count)]
 
 
-def parse_problem_cell(problem_cell, i) -> ProblemResult:
+def parse_problem_cell(problem_cell, i) -> ProblemResultRecord:
     """
     Parses the problem cell and returns the problem stat.
     """
@@ -103,9 +145,7 @@ def parse_problem_cell(problem_cell, i) -> ProblemResult:
 
         submission_id = int(problem_cell.attrs.get("acceptedsubmissionid"))
         time = time_cell.string.strip() if time_cell is not None else "00:00"
-
-        hours, minutes = map(int, time.split(":"))
-        submission_contest_time = hours * 60 + minutes
+        submission_contest_time = contest_minutes(time)
 
         tries = ac_cell.string.strip()[1:]
         # if the problem is accepted, the tries is the number of wrong submissions or
@@ -116,7 +156,7 @@ def parse_problem_cell(problem_cell, i) -> ProblemResult:
         tries = reject_cell.string.strip()[1:]
         tries = int(tries) if len(tries) > 0 else 0
 
-    return ProblemResult(
+    return ProblemResultRecord(
         tries=tries,
         submission_id=submission_id,
         submission_contest_minutes=submission_contest_time,
@@ -1,12 +1,27 @@
+import sys
+
 from bs4 import BeautifulSoup, Tag
-import datetime
 
-import pytz
-from models.domain.submission import Submission
+from models.records.submission_record import SubmissionRecord
+from scraper.row_decoding import (
+    handle_from_href,
+    last_path_segment,
+    moscow_minute_to_utc,
+    parse_digits,
+)
+from scraper.soup import elements, make_soup
+
+# the submissions table and the pagination are the only parts of the page we read
+STATUS_PAGE_TARGETS = elements(
+    ("table", "status-frame-datatable"), ("span", "page-index")
+)
 
 
 def get_status_page_count(page: str) -> int:
-    soup = BeautifulSoup(page, "html.parser")
+    return count_status_pages(make_soup(page, STATUS_PAGE_TARGETS))
+
+
+def count_status_pages(soup: BeautifulSoup) -> int:
     page_indices = soup.find_all("span", class_="page-index")
     if len(page_indices) == 0:
         return 1
@@ -14,13 +29,25 @@ def get_status_page_count(page: str) -> int:
     return pages
 
 
-def parse_status_page(page: str) -> list[Submission]:
-    soup = BeautifulSoup(page, "html.parser")
+def parse_status_page(page: str) -> list[SubmissionRecord]:
+    return parse_status_soup(make_soup(page, STATUS_PAGE_TARGETS))
+
+
+def parse_status_page_with_page_count(page: str) -> tuple[list[SubmissionRecord], int]:
+    """
+    Parses the first status page once and returns its submissions along with the
+    number of status pages.
+    """
+    soup = make_soup(page, STATUS_PAGE_TARGETS)
+    return parse_status_soup(soup), count_status_pages(soup)
+
+
+def parse_status_soup(soup: BeautifulSoup) -> list[SubmissionRecord]:
     table = soup.find("table", class_="status-frame-datatable")
     if table is None:
         raise RuntimeError("Can't find submissions table")
 
-    submissions: list[Submission] = []
+    submissions: list[SubmissionRecord] = []
     rows: list[Tag] = table.find_all("tr", recursive=True)
 
     # column order: submission id, when, who, problem, lang, verdict, time, memory
@@ -28,23 +55,16 @@ def parse_status_page(page: str) -> list[Submission]:
     for row in rows[1:]:
         cells: list[Tag] = row.find_all("td", recursive=False)
         submission_id = int(cells[0].text.strip())
-        # this is utc + 3, regardless of the machine's timezone
-        when = datetime.datetime.strptime(cells[1].text.strip(), "%b/%d/%Y %H:%M")
-        when_utc = (
-            pytz.timezone("Europe/Moscow")
-            .localize(when)
-            .astimezone(pytz.utc)
-            .timestamp()
-        )
-        who = cells[2].find("a")["href"].split("/")[-1].strip().lower()
+        when_utc = moscow_minute_to_utc(cells[1].text.strip())
+        who = handle_from_href(cells[2].find("a")["href"])
         is_virtual = cells[2].find("sup") is not None
-        index = cells[3].find("a")["href"].split("/")[-1].strip()
-        lang = cells[4].text.strip()
-        verdict = cells[5].text.strip()
-        time = int("".join(filter(lambda ch: ch.isdigit(), cells[6].text.strip())))
-        memory = int("".join(filter(lambda ch: ch.isdigit(), cells[7].text.strip())))
+        index = last_path_segment(cells[3].find("a")["href"])
+        lang = sys.intern(cells[4].text.strip())
+        verdict = sys.intern(cells[5].text.strip())
+        time = parse_digits(cells[6].text)
+        memory = parse_digits(cells[7].text)
         submissions.append(
-            Submission(
+            SubmissionRecord(
                 id=submission_id,
                 submission_time_utc=when_utc,
                 handle=who,
@@ -0,0 +1,37 @@
+import datetime
+import logging
+
+from bs4 import SoupStrainer
+
+from models.domain.submission_detail import SubmissionDetail
+from scraper.row_decoding import moscow_to_utc
+from scraper.soup import make_soup
+
+logger = logging.getLogger(__name__)
+
+# the submission table and the source code are the only parts of the page we read
+SUBMISSION_PAGE_TARGETS = SoupStrainer(["table", "pre"])
+
+
+def parse_submission_page(page: str) -> SubmissionDetail:
+    """
+    Parses the submission page and returns the submission details.
+    """
+    soup = make_soup(page, SUBMISSION_PAGE_TARGETS)
+    table = soup.find("table")
+
+    if table is None:
+        raise RuntimeError("Can't find submission table")
+
+    # first cell is the submission id, the time is the one get_submission_time reads
+    cells = table.find_all("tr")[1].find_all("td")
+    when_utc = moscow_to_utc(
+        datetime.datetime.strptime(cells[8].text.strip(), "%Y-%m-%d %H:%M:%S")
+    )
+
+    source = soup.find("pre", id="program-source-text")
+    return SubmissionDetail(
+        id=int(cells[0].text.strip()),
+        submission_time_utc=when_utc,
+        source_code=source.text if source is not None else None,
+    )
@@ -1,74 +1,263 @@
-from collections import defaultdict
-from math import inf
+from collections import defaultdict, deque
 import asyncio
-from typing import Iterable
+import logging
+from typing import AsyncIterator
 from models.domain.problem import Problem
-from models.domain.problem_result import ProblemResult
-from models.domain.standing import ParticipationType, Standing
-from models.domain.submission import Submission
+from models.domain.standing import ParticipationType
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
 from models.requests.contest_summary_request import ContestSummaryRequest
-from models.responses.contest_summary import ContestSummary, SingleRow
+from models.responses.batch_contest_summary import GymSummaries
+from models.responses.contest_summary import ContestSummary
+from monitoring.metrics import observe_phase
 from scraper.page_loader import PageLoader
-from scraper.problems_page_parser import parse_problems
-from scraper.standing_page_parser import get_page_count, parse_standings
-from scraper.status_page_parser import get_status_page_count, parse_status_page
+from scraper.parse_executor import ParseExecutor
+from scraper.session_pool import SessionPool
+from scraper.problems_page_parser import parse_gym_page
+from scraper.standing_page_parser import (
+    parse_standings,
+    parse_standings_with_page_count,
+)
+from scraper.status_page_parser import (
+    parse_status_page,
+    parse_status_page_with_page_count,
+)
+from scraper.submission_page_parser import parse_submission_page
+from service.listing_filters import StandingFilter, SubmissionFilter, select
+from service.scrape_cache import ScrapeCache
+from service.summary_engine import SummaryEngine, SummaryIndex
+
+logger = logging.getLogger(__name__)
 
 
 class CodeForcesService:
-    def __init__(self, page_loader: PageLoader):
-        self.page_loader: PageLoader = page_loader
+    def __init__(
+        self,
+        page_loader: PageLoader | SessionPool,
+        concurrency_budget: asyncio.Semaphore | None = None,
+        cache: ScrapeCache | None = None,
+        parse_executor: ParseExecutor | None = None,
+        summary_engine: SummaryEngine | None = None,
+    ):
+        # a single session, or the session pool, which spreads the page fetches of a
+        # scrape over the sessions of every account
+        self.page_loader: PageLoader | SessionPool = page_loader
+        # Semaphore is used to limit the number of concurrent requests to codeforces.
+        # It is shared by every scrape the service runs, so a summary fetching three
+        # listings at once still stays within one budget.
+        self.concurrency_budget: asyncio.Semaphore = (
+            concurrency_budget or asyncio.Semaphore(10)
+        )
+        self.cache: ScrapeCache | None = cache
+        self.parse_executor: ParseExecutor = parse_executor or ParseExecutor("inline")
+        self.summary_engine: SummaryEngine = summary_engine or SummaryEngine()
+
+    async def __cached(self, gym_id: int, resource: str, load, force: bool = False):
+        with observe_phase(resource):
+            if self.cache is None:
+                return await load(gym_id)
+            return await self.cache.get_or_load(
+                gym_id, resource, lambda: load(gym_id), force
+            )
+
+    async def get_contest_problems(
+        self, gym_id: int, force: bool = False
+    ) -> list[Problem]:
+        return await self.__cached(
+            gym_id, "problems", self.__scrape_contest_problems, force
+        )
+
+    async def get_contest_standings(
+        self, gym_id: int, force: bool = False
+    ) -> list[StandingRecord]:
+        return await self.__cached(
+            gym_id, "standings", self.__scrape_contest_standings, force
+        )
 
-    async def get_contest_problems(self, gym_id: int) -> list[Problem]:
-        print(f"Retrieving contest problems page")
-        page = await self.page_loader.get_gym_page(gym_id)
-        return parse_problems(page)
+    async def get_contest_submissions(
+        self, gym_id: int, force: bool = False
+    ) -> list[SubmissionRecord]:
+        return await self.__cached(
+            gym_id, "submissions", self.__sync_contest_submissions, force
+        )
 
-    async def get_contest_standings(self, gym_id: int):
-        page = await self.page_loader.get_standings_page(gym_id)
-        pages_count = get_page_count(page)
-        result: list[Standing] = []
+    async def find_contest_standings(
+        self,
+        gym_id: int,
+        row_filter: StandingFilter,
+        cursor: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[StandingRecord], int | None]:
+        """
+        Returns a page of the standings matching the filter and the cursor of the next
+        page. Rows are filtered as records, before anything is serialized.
+        """
+        standings = await self.get_contest_standings(gym_id)
+        return select(standings, row_filter.matches, cursor, limit)
+
+    async def find_contest_submissions(
+        self,
+        gym_id: int,
+        row_filter: SubmissionFilter,
+        cursor: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[SubmissionRecord], int | None]:
+        """
+        Returns a page of the submissions matching the filter and the cursor of the
+        next page. Rows are filtered as records, before anything is serialized.
+        """
+        submissions = await self.get_contest_submissions(gym_id)
+        return select(submissions, row_filter.matches, cursor, limit)
 
-        # Semaphore is used to limit the number of concurrent requests to codeforces
-        sem = asyncio.Semaphore(10)
+    async def get_accepted_submission_ids(self, gym_id: int) -> list[int]:
+        """
+        Returns the ids of the accepted submissions the standings of the gym refer to.
+        """
+        standings = await self.get_contest_standings(gym_id)
+        return sorted(
+            {
+                result.submission_id
+                for standing in standings
+                for result in standing.problem_results
+                if result.submission_id is not None
+            }
+        )
 
-        async def get_page(page_index: int):
-            async with sem:
-                print(f"Retrieving standings page {page_index} / {pages_count}")
-                page = await self.page_loader.get_standings_page(gym_id, page_index)
-                return page
+    async def refresh_contest(self, gym_id: int):
+        """
+        Scrapes the problems, standings and submissions of the gym again into the cache,
+        even if the cached ones are still fresh.
+        """
+        await asyncio.gather(
+            self.get_contest_problems(gym_id, force=True),
+            self.get_contest_standings(gym_id, force=True),
+            self.get_contest_submissions(gym_id, force=True),
+        )
 
-        async def get_standings(page_index: int):
-            page = await get_page(page_index)
-            return parse_standings(page)
+    async def __scrape_contest_problems(self, gym_id: int) -> list[Problem]:
+        logger.debug("Retrieving contest problems page")
+        async with self.concurrency_budget:
+            page = await self.page_loader.get_gym_page(gym_id)
+        problems, is_finished = await self.parse_executor.run(parse_gym_page, page)
+        if is_finished and self.cache is not None:
+            await self.cache.mark_finished(gym_id)
+        return problems
+
+    async def __fetch_standings_page(self, gym_id: int, page_index: int) -> str:
+        async with self.concurrency_budget:
+            logger.debug("Retrieving standings page %d", page_index)
+            return await self.page_loader.get_standings_page(gym_id, page_index)
+
+    async def __fetch_status_page(self, gym_id: int, page_index: int) -> str:
+        async with self.concurrency_budget:
+            logger.debug("Retrieving submissions page %d", page_index)
+            return await self.page_loader.get_status_page(gym_id, page_index)
+
+    async def __load_submission_time(self, gym_id: int, submission_id: int) -> int:
+        async with self.concurrency_budget:
+            page = await self.page_loader.get_submission_page(gym_id, submission_id)
+        detail = await self.parse_executor.run(parse_submission_page, page)
+        # the status pages, which the full path reads, only show the minute
+        return detail.submission_time_utc // 60 * 60
+
+    async def __load_standings_page(self, gym_id: int, page_index: int):
+        page = await self.__fetch_standings_page(gym_id, page_index)
+        return await self.parse_executor.run(parse_standings, page)
+
+    async def __load_status_page(self, gym_id: int, page_index: int):
+        page = await self.__fetch_status_page(gym_id, page_index)
+        return await self.parse_executor.run(parse_status_page, page)
+
+    async def __scrape_contest_standings(self, gym_id: int) -> list[StandingRecord]:
+        page = await self.__fetch_standings_page(gym_id, 1)
+        # the first page is parsed once and reused instead of being downloaded again
+        first_page_standings, pages_count = await self.parse_executor.run(
+            parse_standings_with_page_count, page
+        )
+        result: list[StandingRecord] = list(first_page_standings)
 
-        tasks = [get_standings(page_index) for page_index in range(1, pages_count + 1)]
+        tasks = [
+            self.__load_standings_page(gym_id, page_index)
+            for page_index in range(2, pages_count + 1)
+        ]
         standings = await asyncio.gather(*tasks)
 
         for standing in standings:
             result.extend(standing)
 
-        return result
-
-    async def get_contest_submissions(self, gym_id: int):
-        page = await self.page_loader.get_status_page(gym_id, 1)
-        pages_count = get_status_page_count(page)
-        result: list[Submission] = []
+        if self.cache is not None:
+            # remember the pages handles are on, for targeted lookups
+            handle_pages: defaultdict[str, set[int]] = defaultdict(set)
+            for page_index, page in enumerate([first_page_standings, *standings], 1):
+                for standing in page:
+                    handle_pages[standing.handle].add(page_index)
+            await self.cache.put_standings_pages(gym_id, handle_pages)
 
-        # Semaphore is used to limit the number of concurrent requests to the codeforces
-        sem = asyncio.Semaphore(10)
+        return result
 
-        async def get_page(page_index: int):
-            async with sem:
-                print(f"Retrieving submissions page {page_index} / {pages_count}")
-                page = await self.page_loader.get_status_page(gym_id, page_index)
-                return page
+    async def get_contest_standings_of(
+        self, gym_id: int, handles: list[str]
+    ) -> list[StandingRecord]:
+        """
+        Returns the standings rows of the given handles. Only the standings pages the
+        handles were found on by previous scrapes are fetched, the full standings are
+        scraped only when that index can't answer.
+        """
+        wanted = {handle.lower() for handle in handles}
+        with observe_phase("standings_targeted"):
+            standings = await self.__scrape_standings_of(gym_id, wanted)
+            if standings is None:
+                standings = await self.get_contest_standings(gym_id)
+        return [standing for standing in standings if standing.handle in wanted]
+
+    async def __scrape_standings_of(
+        self, gym_id: int, handles: set[str]
+    ) -> list[StandingRecord] | None:
+        if self.cache is None:
+            return None
+        entry = await self.cache.peek(gym_id, "standings")
+        if entry is not None and entry.is_fresh:
+            return entry.value
+
+        handle_pages = await self.cache.get_standings_pages(gym_id, sorted(handles))
+        # a handle missing from the index of a running contest may have joined since
+        if handle_pages is None or (
+            len(handle_pages) < len(handles) and not self.cache.is_finished(gym_id)
+        ):
+            return None
+
+        page_indexes = sorted(
+            {page for pages in handle_pages.values() for page in pages}
+        )
+        pages = await asyncio.gather(
+            *(self.__load_standings_page(gym_id, page) for page in page_indexes)
+        )
+        standings = [standing for page in pages for standing in page]
+
+        # rows move between pages while a contest is running
+        if not handle_pages.keys() <= {standing.handle for standing in standings}:
+            logger.info("Standings page index of gym %s is stale", gym_id)
+            return None
+
+        logger.info(
+            "Fetched %d standings pages for %d handles of gym %s",
+            len(page_indexes),
+            len(handles),
+            gym_id,
+        )
+        return standings
 
-        async def get_submissions(page_index: int):
-            page = await get_page(page_index)
-            return parse_status_page(page)
+    async def __scrape_contest_submissions(self, gym_id: int) -> list[SubmissionRecord]:
+        page = await self.__fetch_status_page(gym_id, 1)
+        # the first page is parsed once and reused instead of being downloaded again
+        first_page_submissions, pages_count = await self.parse_executor.run(
+            parse_status_page_with_page_count, page
+        )
+        result: list[SubmissionRecord] = list(first_page_submissions)
 
         tasks = [
-            get_submissions(page_index) for page_index in range(1, pages_count + 1)
+            self.__load_status_page(gym_id, page_index)
+            for page_index in range(2, pages_count + 1)
         ]
         submissions = await asyncio.gather(*tasks)
 
@@ -77,140 +266,289 @@ class CodeForcesService:
 
         return result
 
-    def __correct_rank(self, standings: Iterable[Standing]) -> list[Standing]:
-        result: list[Standing] = sorted(standings, key=lambda standing: standing.rank)
-        for i, standing in enumerate(result):
-            if i == 0:
-                standing.rank = 1
-            elif standing.penalty == result[i - 1].penalty:
-                standing.rank = result[i - 1].rank
+    async def iter_contest_standings(
+        self,
+        gym_id: int,
+        in_flight_pages: int = 4,
+        row_filter: StandingFilter | None = None,
+    ) -> AsyncIterator[StandingRecord]:
+        """
+        Yields the standings of the gym page by page as they are fetched and parsed,
+        keeping at most in_flight_pages pages in memory. With a filter, rows that
+        don't match are dropped as each page is parsed.
+        """
+        matches = row_filter.matches if row_filter is not None else lambda _: True
+        entry = await self.cache.peek(gym_id, "standings") if self.cache else None
+        if entry is not None and entry.is_fresh:
+            for standing in filter(matches, entry.value):
+                yield standing
+            return
+
+        page = await self.__fetch_standings_page(gym_id, 1)
+        standings, pages_count = await self.parse_executor.run(
+            parse_standings_with_page_count, page
+        )
+        for standing in filter(matches, standings):
+            yield standing
+
+        async for standings in self.__iter_pages(
+            lambda page_index: self.__load_standings_page(gym_id, page_index),
+            pages_count,
+            in_flight_pages,
+        ):
+            for standing in filter(matches, standings):
+                yield standing
+
+    async def iter_contest_submissions(
+        self,
+        gym_id: int,
+        in_flight_pages: int = 4,
+        row_filter: SubmissionFilter | None = None,
+    ) -> AsyncIterator[SubmissionRecord]:
+        """
+        Yields the submissions of the gym page by page as they are fetched and parsed,
+        keeping at most in_flight_pages pages in memory. With a filter, rows that
+        don't match are dropped as each page is parsed.
+        """
+        matches = row_filter.matches if row_filter is not None else lambda _: True
+        entry = await self.cache.peek(gym_id, "submissions") if self.cache else None
+        if entry is not None and entry.is_fresh:
+            for submission in filter(matches, entry.value):
+                yield submission
+            return
+
+        page = await self.__fetch_status_page(gym_id, 1)
+        submissions, pages_count = await self.parse_executor.run(
+            parse_status_page_with_page_count, page
+        )
+        for submission in filter(matches, submissions):
+            yield submission
+
+        async for submissions in self.__iter_pages(
+            lambda page_index: self.__load_status_page(gym_id, page_index),
+            pages_count,
+            in_flight_pages,
+        ):
+            for submission in filter(matches, submissions):
+                yield submission
+
+    async def __iter_pages(self, load_page, pages_count: int, in_flight_pages: int):
+        """
+        Loads pages 2..pages_count with a sliding window of in_flight_pages
+        concurrent loads and yields them in page order.
+        """
+        pending: deque[asyncio.Task] = deque()
+        next_page = 2
+        try:
+            while next_page <= pages_count or pending:
+                while next_page <= pages_count and len(pending) < in_flight_pages:
+                    pending.append(asyncio.create_task(load_page(next_page)))
+                    next_page += 1
+                yield await pending.popleft()
+        finally:
+            # the consumer may stop early, e.g. when the client disconnects
+            for task in pending:
+                task.cancel()
+
+    async def __sync_contest_submissions(self, gym_id: int) -> list[SubmissionRecord]:
+        """
+        Refreshes the cached submissions of the gym incrementally. Status pages are
+        ordered by judging time, newest first, so pages are fetched one by one until
+        a page contains a submission we already know with the same verdict. Everything
+        after it was judged before the previous sync, so the cost of a refresh is
+        proportional to the number of new submissions rather than the contest size.
+        """
+        entry = await self.cache.peek(gym_id, "submissions") if self.cache else None
+        if entry is None or len(entry.value) == 0:
+            return await self.__scrape_contest_submissions(gym_id)
+
+        known: dict[int, SubmissionRecord] = {sub.id: sub for sub in entry.value}
+        max_known_id = max(known)
+        # new and rejudged submissions, in the order codeforces reports them
+        delta: dict[int, SubmissionRecord] = {}
+        page_index, pages_count = 1, 1
+
+        while page_index <= pages_count:
+            page = await self.__fetch_status_page(gym_id, page_index)
+
+            if page_index == 1:
+                submissions, pages_count = await self.parse_executor.run(
+                    parse_status_page_with_page_count, page
+                )
             else:
-                standing.rank = i + 1
-
-        return result
+                submissions = await self.parse_executor.run(parse_status_page, page)
+
+            reached_known = False
+            for sub in submissions:
+                if sub.id <= max_known_id and known.get(sub.id) == sub:
+                    reached_known = True
+                else:
+                    delta.setdefault(sub.id, sub)
+
+            if reached_known:
+                break
+            page_index += 1
+
+        logger.info(
+            "Synced %d submissions of gym %s from %d status pages",
+            len(delta),
+            gym_id,
+            page_index,
+        )
+        return list(delta.values()) + [
+            sub for sub in entry.value if sub.id not in delta
+        ]
 
-    def __remove_dual_participation(self, standings: list[Standing]) -> list[Standing]:
+    async def __get_contest_snapshot(
+        self,
+        gym_id: int,
+        handles: list[str] | None = None,
+        virtual_enabled: bool = True,
+    ) -> SummaryIndex:
         """
-        Removes participants' virtual participation from the contest if they have already participated in the contest in
-        person and corrects the ranks.
+        Returns the summary index of the gym. With handles, only their standings are
+        fetched and the index is built for this summary alone.
         """
-
-        # Identify the participants who have participated in the contest in person and virtually
-        in_contest_participants = set(
-            map(
-                lambda st: st.handle,
-                filter(
-                    lambda st: st.participation_type == ParticipationType.IN_CONTEST,
-                    standings,
-                ),
+        if handles is not None:
+            standings, problems = await asyncio.gather(
+                self.get_contest_standings_of(gym_id, handles),
+                self.get_contest_problems(gym_id),
             )
-        )
-        virtual_participants = set(
-            map(
-                lambda st: st.handle,
-                filter(
-                    lambda st: st.participation_type == ParticipationType.VIRTUAL,
-                    standings,
-                ),
+            submissions, submission_times = await self.__get_submission_times_of(
+                gym_id, standings if virtual_enabled else []
             )
-        )
-        dual_participants = in_contest_participants.intersection(virtual_participants)
-
-        result: list[Standing] = []
+            with observe_phase("summary_index"):
+                return SummaryIndex(
+                    submissions,
+                    standings,
+                    problems,
+                    partial=True,
+                    submission_times=submission_times,
+                )
 
-        for standing in standings:
-            if (
-                standing.participation_type == ParticipationType.IN_CONTEST
-                or standing.handle not in dual_participants
-            ) and standing.participation_type != ParticipationType.AFTER_CONTEST:
-                result.append(standing)
+        # the three listings are independent, so they are scraped concurrently
+        submissions, standings, problems = await asyncio.gather(
+            self.get_contest_submissions(gym_id),
+            self.get_contest_standings(gym_id),
+            self.get_contest_problems(gym_id),
+        )
+        with observe_phase("summary_index"):
+            return self.summary_engine.index(gym_id, submissions, standings, problems)
 
-        return result
+    async def __get_submission_times_of(
+        self, gym_id: int, standings: list[StandingRecord]
+    ) -> tuple[list[SubmissionRecord], dict[int, int]]:
+        """
+        Returns what a summary of the standings rows needs to check virtual rows
+        against the deadline, either the submissions of the gym or the times of the
+        accepted submissions of the virtual rows. In contest rows need neither. The
+        submission pages are only fetched while they are fewer than the status pages.
+        """
+        virtual = [
+            standing
+            for standing in standings
+            if standing.participation_type == ParticipationType.VIRTUAL
+        ]
+        if not virtual:
+            return [], {}
+
+        entry = await self.cache.peek(gym_id, "submissions") if self.cache else None
+        # cached submissions are synced incrementally, and the earliest submission of
+        # a row that solved nothing is only found in the submissions
+        if entry is not None or any(standing.solved == 0 for standing in virtual):
+            return await self.get_contest_submissions(gym_id), {}
+
+        submission_ids = sorted(
+            {
+                result.submission_id
+                for standing in virtual
+                for result in standing.problem_results
+                if result.is_accepted and result.submission_id is not None
+            }
+        )
+        if len(submission_ids) > 1:
+            # one page per accepted problem may cost more than the whole listing
+            _, pages_count = await self.parse_executor.run(
+                parse_status_page_with_page_count,
+                await self.__fetch_status_page(gym_id, 1),
+            )
+            if len(submission_ids) > pages_count:
+                return await self.get_contest_submissions(gym_id), {}
+
+        with observe_phase("submission_times"):
+            times = await asyncio.gather(
+                *(
+                    self.__load_submission_time(gym_id, submission_id)
+                    for submission_id in submission_ids
+                )
+            )
+        return [], dict(zip(submission_ids, times))
 
     async def get_contest_summary(
         self, request: ContestSummaryRequest
     ) -> ContestSummary:
-        submissions = await self.get_contest_submissions(request.gym_id)
-        standings = await self.get_contest_standings(request.gym_id)
-        problems = await self.get_contest_problems(request.gym_id)
-
-        request.handles = map(lambda handle: handle.lower(), request.handles)
-
-        submissions_lookup: dict[int, Submission] = {sub.id: sub for sub in submissions}
-
-        submissions_by_handle: defaultdict[str, list[Submission]] = defaultdict(list)
-        for sub in submissions:
-            submissions_by_handle[sub.handle].append(sub)
-
-        # remove non in contest participation if virtual disabled
-        standings = list(
-            filter(
-                lambda standing: standing.participation_type
-                == ParticipationType.IN_CONTEST
-                or (
-                    standing.participation_type == ParticipationType.VIRTUAL
-                    and request.virtual_enabled
-                ),
-                standings,
-            )
+        index = await self.__get_contest_snapshot(
+            request.gym_id,
+            request.handles if request.targeted else None,
+            request.virtual_enabled,
         )
+        with observe_phase("summarize"):
+            return index.summarize(request)
 
-        if request.virtual_enabled:
-            standings = self.__remove_dual_participation(standings)
-
-        standings = self.__correct_rank(standings)
-
-        # Earliest standing for each handle is used, if multiple encountered
-        earliest_standing: dict[str, tuple[int, Standing]] = {}
-
-        def get_submission_time(prob_res: ProblemResult):
-            if prob_res.is_accepted:
-                return submissions_lookup[prob_res.submission_id].submission_time_utc
-            else:
-                return inf
-
-        for standing in standings:
-            current = (
-                earliest_standing[standing.handle]
-                if standing.handle in earliest_standing
-                else (inf, standing)
-            )
-            earliest_submission_time = min(
-                map(get_submission_time, standing.problem_results)
-            )
-
-            if earliest_submission_time == inf:
-                # user didn't solve any problem, so we take the time of the earliest submission by this user
-                # this is only needed for virtual participation, because in contest participation is not
-                # checked against virtual deadline
-                earliest_submission_time = min(
-                    map(
-                        lambda sub: sub.submission_time_utc,
-                        submissions_by_handle[standing.handle],
+    async def get_contest_summaries(
+        self, requests: list[ContestSummaryRequest]
+    ) -> dict[int, GymSummaries]:
+        """
+        Computes summaries for many gyms at once. Each gym is scraped once no matter
+        how many requests refer to it, and a gym that fails doesn't fail the others.
+        """
+        requests_by_gym: defaultdict[int, list[ContestSummaryRequest]] = defaultdict(
+            list
+        )
+        for request in requests:
+            requests_by_gym[request.gym_id].append(request)
+
+        async def summarize_gym(gym_id: int, gym_requests: list[ContestSummaryRequest]):
+            targeted_handles = [
+                handle
+                for request in gym_requests
+                if request.targeted
+                for handle in request.handles
+            ]
+            try:
+                # the full snapshot goes first, so targeted ones reuse its standings
+                index = (
+                    await self.__get_contest_snapshot(gym_id)
+                    if not all(request.targeted for request in gym_requests)
+                    else None
+                )
+                targeted_index = (
+                    await self.__get_contest_snapshot(
+                        gym_id,
+                        targeted_handles,
+                        any(
+                            request.virtual_enabled
+                            for request in gym_requests
+                            if request.targeted
+                        ),
                     )
+                    if any(request.targeted for request in gym_requests)
+                    else None
                 )
-
-            if (
-                standing.participation_type == ParticipationType.VIRTUAL
-                and earliest_submission_time > request.virtual_deadline_utc
-            ):
-                continue
-
-            earliest_standing[standing.handle] = min(
-                current, (earliest_submission_time, standing)
+            except Exception as e:
+                logger.exception("Summarizing gym %s failed", gym_id)
+                return GymSummaries(summaries=None, error=f"{type(e).__name__}: {e}")
+            return GymSummaries(
+                summaries=[
+                    (targeted_index if request.targeted else index).summarize(request)
+                    for request in gym_requests
+                ]
             )
 
-        summary: ContestSummary = ContestSummary(total_problems=len(problems), rows={})
-
-        for handle in request.handles:
-            if handle not in earliest_standing:
-                summary.rows[handle] = None
-                continue
-            _, standing = earliest_standing[handle]
-            summary.rows[handle] = SingleRow(
-                rank=standing.rank,
-                ac_count=standing.solved,
-                participation_type=standing.participation_type,
+        results = await asyncio.gather(
+            *(
+                summarize_gym(gym_id, gym_requests)
+                for gym_id, gym_requests in requests_by_gym.items()
             )
-
-        return summary
+        )
+        return dict(zip(requests_by_gym, results))
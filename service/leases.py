@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Leases(ABC):
+    """
+    Leases let the workers of the service agree on which of them does a piece of
+    work, e.g. scraping a gym, so it is done once however many workers need it. A
+    lease is held by one worker until it is released or its ttl runs out, so work
+    left by a worker that died is taken over. A worker may acquire a lease it holds
+    again, which extends it.
+    """
+
+    def __init__(self, ttl: float = 30) -> None:
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+    @abstractmethod
+    async def acquire(self, name: str, ttl: float | None = None) -> bool:
+        ...
+
+    @abstractmethod
+    async def renew(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def release(self, name: str):
+        ...
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def holding(self, name: str):
+        """
+        Keeps renewing an acquired lease while the block runs and releases it after.
+        """
+
+        async def keep_renewing():
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                if not await self.renew(name):
+                    logger.warning("Lease %s was lost while held", name)
+                    return
+
+        task = asyncio.create_task(keep_renewing())
+        try:
+            yield
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await self.release(name)
+
+
+class SqliteLeases(Leases):
+    """
+    SQLite leases are kept in a table of a file shared by the workers of one host,
+    usually the scrape cache file.
+    """
+
+    def __init__(self, path: str, ttl: float = 30) -> None:
+        super().__init__(ttl)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    async def acquire(self, name: str, ttl: float | None = None) -> bool:
+        return await asyncio.to_thread(self.__acquire, name, ttl or self.ttl)
+
+    async def renew(self, name: str) -> bool:
+        return await asyncio.to_thread(
+            self.__execute,
+            "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?",
+            (time.time() + self.ttl, name, self.owner),
+        )
+
+    async def release(self, name: str):
+        await asyncio.to_thread(
+            self.__execute,
+            "DELETE FROM leases WHERE name = ? AND owner = ?",
+            (name, self.owner),
+        )
+
+    async def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __acquire(self, name: str, ttl: float) -> bool:
+        now = time.time()
+        return self.__execute(
+            """
+            INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE
+                SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+            """,
+            (name, self.owner, now + ttl, now),
+        )
+
+    def __execute(self, sql: str, parameters: tuple) -> bool:
+        """Returns whether a row changed."""
+        with self.lock:
+            return self.connection.execute(sql, parameters).rowcount > 0
+
+
+class RedisLeases(Leases):
+    """
+    Redis leases are kept in a Redis server, so workers on several hosts can share
+    them. Needs the redis package, which isn't installed by default.
+    """
+
+    ACQUIRE = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+    end
+    return redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) and 1 or 0
+    """
+    RENEW = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, ttl: float = 30) -> None:
+        if redis is None:
+            raise RuntimeError("Redis leases need the redis package installed")
+        super().__init__(ttl)
+        self.client = redis.from_url(url)
+
+    async def acquire(self, name: str, ttl: float | None = None) -> bool:
+        return await self.__eval(self.ACQUIRE, name, ttl or self.ttl)
+
+    async def renew(self, name: str) -> bool:
+        return await self.__eval(self.RENEW, name, self.ttl)
+
+    async def release(self, name: str):
+        await self.client.eval(self.RELEASE, 1, f"lease:{name}", self.owner)
+
+    async def close(self):
+        await self.client.close()
+
+    async def __eval(self, script: str, name: str, ttl: float) -> bool:
+        return bool(
+            await self.client.eval(
+                script, 1, f"lease:{name}", self.owner, int(ttl * 1000)
+            )
+        )
+
+
+def open_leases(backend: str, path: str, ttl: float = 30) -> Leases | None:
+    """
+    Opens the leases of the backend, "sqlite" for leases in the file at path or a
+    redis:// url, or returns None if backend is empty.
+    """
+    if not backend:
+        return None
+    if backend == "sqlite":
+        return SqliteLeases(path, ttl)
+    if backend.startswith(("redis://", "rediss://", "unix://")):
+        return RedisLeases(backend, ttl)
+    raise ValueError(f"Unknown lease backend {backend}")
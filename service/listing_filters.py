@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from models.domain.standing import ParticipationType
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
+
+T = TypeVar("T")
+
+
+@dataclass
+class SubmissionFilter:
+    # None matches everything. Handles are matched case insensitively, verdicts by
+    # their beginning, e.g. "wrong answer" matches "Wrong answer on test 2".
+    handles: set[str] | None = None
+    verdicts: tuple[str, ...] | None = None
+    problems: set[str] | None = None
+    is_virtual: bool | None = None
+
+    def __post_init__(self):
+        if self.handles is not None:
+            self.handles = {handle.lower() for handle in self.handles}
+        if self.verdicts is not None:
+            self.verdicts = tuple(verdict.lower() for verdict in self.verdicts)
+        if self.problems is not None:
+            self.problems = {problem.upper() for problem in self.problems}
+
+    def matches(self, submission: SubmissionRecord) -> bool:
+        return (
+            (self.handles is None or submission.handle in self.handles)
+            and (
+                self.verdicts is None
+                or submission.verdict.lower().startswith(self.verdicts)
+            )
+            and (self.problems is None or submission.problem_index in self.problems)
+            and (self.is_virtual is None or submission.is_virtual == self.is_virtual)
+        )
+
+
+@dataclass
+class StandingFilter:
+    handles: set[str] | None = None
+    participation_types: set[ParticipationType] | None = None
+
+    def __post_init__(self):
+        if self.handles is not None:
+            self.handles = {handle.lower() for handle in self.handles}
+
+    def matches(self, standing: StandingRecord) -> bool:
+        return (self.handles is None or standing.handle in self.handles) and (
+            self.participation_types is None
+            or standing.participation_type in self.participation_types
+        )
+
+
+def select(
+    records: list[T],
+    matches: Callable[[T], bool],
+    cursor: int = 0,
+    limit: int | None = None,
+) -> tuple[list[T], int | None]:
+    """
+    Returns up to limit matching records from the cursor on, along with the cursor
+    of the next page, or None if there are no more records. Cursors are positions
+    in the unfiltered records.
+    """
+    selected: list[T] = []
+    for position in range(cursor, len(records)):
+        if limit is not None and len(selected) == limit:
+            return selected, position
+        if matches(records[position]):
+            selected.append(records[position])
+    return selected, None
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Callable
+
+from monitoring.metrics import observe_phase
+from service.codeforces_service import CodeForcesService
+from service.leases import Leases
+from service.scrape_cache import ScrapeCache
+from service.watch_registry import WatchRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Refresh scheduler periodically scrapes every watched gym into the cache in the
+    background, so requests for watched gyms are served from a warm snapshot.
+
+    Running contests are refreshed first and more often than finished ones, refresh
+    times are jittered so gyms don't line up, and refreshing pauses while user
+    requests are using the whole upstream concurrency budget. With leases, a gym is
+    refreshed by one worker per interval, the others skip it.
+    """
+
+    def __init__(
+        self,
+        registry: WatchRegistry,
+        cache: ScrapeCache,
+        concurrency_budget: asyncio.Semaphore,
+        create_service: Callable[[], CodeForcesService],
+        running_interval: float = 30,
+        finished_interval: float = 6 * 60 * 60,
+        jitter: float = 0.1,
+        tick: float = 1,
+        leases: Leases | None = None,
+    ) -> None:
+        self.registry = registry
+        self.cache = cache
+        self.concurrency_budget = concurrency_budget
+        self.create_service = create_service
+        self.running_interval = running_interval
+        self.finished_interval = finished_interval
+        self.jitter = jitter
+        self.tick = tick
+        self.leases = leases
+        # time.monotonic() at which each gym is due for a refresh
+        self.next_refresh_at: dict[int, float] = {}
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            now = time.monotonic()
+            due = [
+                gym_id
+                for gym_id in self.registry.gym_ids
+                if self.next_refresh_at.get(gym_id, 0) <= now
+            ]
+            # running contests change, finished ones don't, so running ones go first
+            due.sort(key=self.cache.is_finished)
+
+            for gym_id in due:
+                if self.concurrency_budget.locked():
+                    # user requests come first, the refresh waits for the next tick
+                    break
+                await self.refresh(gym_id)
+
+            await asyncio.sleep(self.tick)
+
+    async def refresh(self, gym_id: int):
+        if self.leases is None or await self.leases.acquire(
+            f"refresh:{gym_id}", self.__interval(gym_id)
+        ):
+            await self.__refresh(gym_id)
+        else:
+            logger.debug("Watched gym %s is refreshed by another worker", gym_id)
+
+        interval = self.__interval(gym_id)
+        self.next_refresh_at[gym_id] = time.monotonic() + interval * random.uniform(
+            1 - self.jitter, 1 + self.jitter
+        )
+
+    def __interval(self, gym_id: int) -> float:
+        if self.cache.is_finished(gym_id):
+            return self.finished_interval
+        return self.running_interval
+
+    async def __refresh(self, gym_id: int):
+        logger.info("Refreshing watched gym %s", gym_id)
+        try:
+            with observe_phase("refresh"):
+                await self.create_service().refresh_contest(gym_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Refreshing watched gym %s failed", gym_id)
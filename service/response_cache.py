@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# bodies smaller than this aren't worth compressing
+MIN_COMPRESSED_SIZE = 1024
+
+# content encodings we can produce, in order of preference
+ENCODERS = [("gzip", lambda body: gzip.compress(body, compresslevel=6))]
+if brotli is not None:
+    ENCODERS.insert(0, ("br", lambda body: brotli.compress(body, quality=5)))
+
+
+def dump_jsend(data, message: str = "OK") -> bytes:
+    """
+    Serializes a JSend response straight from records. orjson writes dataclasses and
+    enums natively, so no pydantic model is built or validated on the way out.
+    """
+    return orjson.dumps({"message": message, "data": data})
+
+
+def project(record, fields: list[str]) -> dict:
+    return {field: getattr(record, field) for field in fields}
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    encodings = set()
+    for token in accept_encoding.split(","):
+        encoding, _, parameters = token.strip().partition(";")
+        if parameters.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(encoding.strip())
+    return encodings
+
+
+@dataclass
+class EncodedResponse:
+    body: bytes
+    etag: str
+    # compressed bodies by content encoding, made on first use
+    compressed: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, body: bytes) -> "EncodedResponse":
+        return cls(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def encode(self, accept_encoding: str) -> tuple[bytes, str | None]:
+        """
+        Returns the body compressed with the preferred encoding the client accepts,
+        along with the encoding, or the body as is.
+        """
+        if len(self.body) < MIN_COMPRESSED_SIZE:
+            return self.body, None
+        encodings = accepted_encodings(accept_encoding)
+        for encoding, compress in ENCODERS:
+            if encoding in encodings:
+                if encoding not in self.compressed:
+                    self.compressed[encoding] = compress(self.body)
+                return self.compressed[encoding], encoding
+        return self.body, None
+
+
+class ResponseCache:
+    """
+    Response cache keeps the serialized, and lazily compressed, full listings of
+    recently requested gyms. An entry is reused as long as the listing it was made
+    from is the one the scrape cache returns, so an unchanged contest is served
+    without serializing it again.
+    """
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[
+            tuple[int, str], tuple[list, EncodedResponse]
+        ] = OrderedDict()
+
+    def get(self, gym_id: int, resource: str, records: list) -> EncodedResponse:
+        key = (gym_id, resource)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not records:
+            entry = (records, EncodedResponse.of(dump_jsend(records)))
+            self.entries[key] = entry
+
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry[1]
@@ -0,0 +1,299 @@
+import asyncio
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+
+from service.leases import Leases
+
+T = TypeVar("T")
+
+# bump when the types of cached values change, older entries are dropped on open
+FORMAT_VERSION = 2
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    # Unix timestamp in seconds
+    fetched_at: float
+    # Unix timestamp in seconds, None if the entry never expires
+    expires_at: float | None
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at is None or time.time() < self.expires_at
+
+
+class ScrapeCache:
+    """
+    Scrape cache stores scraped contest data keyed by gym id and resource
+    (problems, standings, submissions). Entries live in an in-memory LRU in front of
+    an SQLite file, so they survive restarts. Entries of running contests expire
+    after a TTL, while entries of finished contests never expire because the data
+    can't change anymore.
+
+    Concurrent loads of the same key are coalesced: only the first caller scrapes,
+    the others wait for its result. With leases, the file is shared by several
+    workers and loads are coalesced across them too: one worker scrapes a key while
+    the others wait for its lease and read what it stored.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        running_ttl: float = 60,
+        memory_entries: int = 64,
+        leases: Leases | None = None,
+        lease_poll: float = 0.2,
+    ) -> None:
+        self.running_ttl = running_ttl
+        self.memory_entries = memory_entries
+        self.memory: OrderedDict[tuple[int, str], CacheEntry] = OrderedDict()
+        self.in_flight: dict[tuple[int, str], asyncio.Task] = {}
+        self.leases = leases
+        # seconds between attempts to take a lease held by another worker
+        self.lease_poll = lease_poll
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                gym_id INTEGER NOT NULL,
+                resource TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (gym_id, resource)
+            );
+            CREATE TABLE IF NOT EXISTS finished_gyms (
+                gym_id INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS standings_pages (
+                gym_id INTEGER NOT NULL,
+                handle TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                PRIMARY KEY (gym_id, handle, page)
+            );
+            """
+        )
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != FORMAT_VERSION:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+            self.connection.commit()
+
+        self.finished_gyms: set[int] = self.__load_finished_gyms()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def is_finished(self, gym_id: int) -> bool:
+        return gym_id in self.finished_gyms
+
+    async def mark_finished(self, gym_id: int):
+        if gym_id in self.finished_gyms:
+            return
+        self.finished_gyms.add(gym_id)
+        await asyncio.to_thread(
+            self.__execute,
+            "INSERT OR IGNORE INTO finished_gyms (gym_id) VALUES (?)",
+            (gym_id,),
+        )
+
+    async def put_standings_pages(self, gym_id: int, pages: dict[str, set[int]]):
+        """
+        Replaces the index of the standings pages each handle of the gym appears on.
+        """
+        await asyncio.to_thread(self.__store_standings_pages, gym_id, pages)
+
+    async def get_standings_pages(
+        self, gym_id: int, handles: list[str]
+    ) -> dict[str, list[int]] | None:
+        """
+        Returns the standings pages the given handles appear on, handles that aren't
+        indexed are left out. Returns None if the gym has no index at all.
+        """
+        return await asyncio.to_thread(self.__load_standings_pages, gym_id, handles)
+
+    async def peek(self, gym_id: int, resource: str) -> CacheEntry | None:
+        """
+        Returns the cached entry whether it is fresh or not.
+        """
+        key = (gym_id, resource)
+        entry = self.memory.get(key)
+        if entry is not None and self.leases is not None:
+            # another worker may have stored a newer value since
+            fetched_at = await asyncio.to_thread(self.__fetched_at, key)
+            if fetched_at is not None and fetched_at > entry.fetched_at:
+                entry = None
+        if entry is not None:
+            self.memory.move_to_end(key)
+            return entry
+
+        entry = await asyncio.to_thread(self.__load, key)
+        if entry is not None:
+            self.__remember(key, entry)
+        return entry
+
+    async def put(self, gym_id: int, resource: str, value: Any):
+        now = time.time()
+        # finished contests can't change anymore, so their data never expires
+        expires_at = None if self.is_finished(gym_id) else now + self.running_ttl
+        entry = CacheEntry(value=value, fetched_at=now, expires_at=expires_at)
+        self.__remember((gym_id, resource), entry)
+        await asyncio.to_thread(self.__store, (gym_id, resource), entry)
+
+    async def get_or_load(
+        self,
+        gym_id: int,
+        resource: str,
+        load: Callable[[], Awaitable[T]],
+        force: bool = False,
+    ) -> T:
+        """
+        Returns the cached value if it is fresh, otherwise loads, stores and returns it.
+        With force, the value is loaded even if the cached one is fresh.
+        """
+        if not force:
+            entry = await self.peek(gym_id, resource)
+            if entry is not None and entry.is_fresh:
+                return entry.value
+
+        key = (gym_id, resource)
+        if key not in self.in_flight:
+
+            async def load_and_store():
+                try:
+                    if self.leases is not None:
+                        return await self.__load_shared(gym_id, resource, load, force)
+                    value = await load()
+                    await self.put(gym_id, resource, value)
+                    return value
+                finally:
+                    del self.in_flight[key]
+
+            self.in_flight[key] = asyncio.create_task(load_and_store())
+
+        # shielded, so a caller going away doesn't cancel the load the others wait on
+        return await asyncio.shield(self.in_flight[key])
+
+    async def __load_shared(
+        self,
+        gym_id: int,
+        resource: str,
+        load: Callable[[], Awaitable[T]],
+        force: bool,
+    ) -> T:
+        """
+        Loads the value under the lease of the key. A worker that gets the lease after
+        another one takes the value stored by it, if it is fresh, or with force, if it
+        was fetched after this worker started waiting.
+        """
+        key = (gym_id, resource)
+        name = f"scrape:{gym_id}:{resource}"
+        started_at = time.time()
+        while not await self.leases.acquire(name):
+            await asyncio.sleep(self.lease_poll)
+
+        async with self.leases.holding(name):
+            # another worker sharing the file may have marked gyms finished since
+            self.finished_gyms |= await asyncio.to_thread(self.__load_finished_gyms)
+            entry = await asyncio.to_thread(self.__load, key)
+            if entry is not None and (
+                entry.fetched_at >= started_at if force else entry.is_fresh
+            ):
+                self.__remember(key, entry)
+                return entry.value
+
+            value = await load()
+            await self.put(gym_id, resource, value)
+            return value
+
+    def __remember(self, key: tuple[int, str], entry: CacheEntry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def __execute(self, sql: str, parameters: tuple):
+        with self.lock:
+            self.connection.execute(sql, parameters)
+            self.connection.commit()
+
+    def __store_standings_pages(self, gym_id: int, pages: dict[str, set[int]]):
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM standings_pages WHERE gym_id = ?", (gym_id,)
+            )
+            self.connection.executemany(
+                "INSERT INTO standings_pages (gym_id, handle, page) VALUES (?, ?, ?)",
+                (
+                    (gym_id, handle, page)
+                    for handle, handle_pages in pages.items()
+                    for page in handle_pages
+                ),
+            )
+            self.connection.commit()
+
+    def __load_standings_pages(
+        self, gym_id: int, handles: list[str]
+    ) -> dict[str, list[int]] | None:
+        with self.lock:
+            if (
+                self.connection.execute(
+                    "SELECT 1 FROM standings_pages WHERE gym_id = ? LIMIT 1", (gym_id,)
+                ).fetchone()
+                is None
+            ):
+                return None
+            # one lookup per handle keeps clear of the sqlite parameter limit
+            pages: dict[str, list[int]] = {}
+            for handle in handles:
+                for (page,) in self.connection.execute(
+                    "SELECT page FROM standings_pages WHERE gym_id = ? AND handle = ?",
+                    (gym_id, handle),
+                ):
+                    pages.setdefault(handle, []).append(page)
+        return pages
+
+    def __load_finished_gyms(self) -> set[int]:
+        with self.lock:
+            return {
+                gym_id
+                for (gym_id,) in self.connection.execute(
+                    "SELECT gym_id FROM finished_gyms"
+                )
+            }
+
+    def __fetched_at(self, key: tuple[int, str]) -> float | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched_at FROM entries WHERE gym_id = ? AND resource = ?", key
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def __load(self, key: tuple[int, str]) -> CacheEntry | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched_at, expires_at, value FROM entries WHERE gym_id = ? AND resource = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        fetched_at, expires_at, value = row
+        return CacheEntry(
+            value=pickle.loads(value), fetched_at=fetched_at, expires_at=expires_at
+        )
+
+    def __store(self, key: tuple[int, str], entry: CacheEntry):
+        self.__execute(
+            "INSERT OR REPLACE INTO entries (gym_id, resource, fetched_at, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+            (*key, entry.fetched_at, entry.expires_at, pickle.dumps(entry.value)),
+        )
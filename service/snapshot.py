@@ -0,0 +1,409 @@
+"""
+Contest snapshots are the problems, standings and submissions of a scraped gym in a
+compact columnar file, used to move scraped gyms between caches and replicas.
+
+Usage: python -m service.snapshot export GYM_ID PATH [--cache CACHE_PATH]
+       python -m service.snapshot import PATH [--cache CACHE_PATH]
+"""
+import argparse
+import asyncio
+import json
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+
+from models.domain.problem import Problem
+from models.domain.standing import ParticipationType
+from models.records.problem_result_record import ProblemResultRecord
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
+from service.scrape_cache import ScrapeCache
+
+# A snapshot is a header, a directory of sections and the sections. Every section
+# is a little endian array of fixed size numbers, a utf-8 blob or json, and starts
+# at a multiple of 8 bytes, so numeric columns are read straight from a memory map.
+# Strings are stored once and referred to by their index. None is stored as -1.
+MAGIC = b"CFSNAP\0\0"
+# bump when the layout changes, older snapshots are rejected on import
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sII")
+DIRECTORY_ENTRY = struct.Struct("<48sQQ")
+
+# section name, array typecode
+STANDING_COLUMNS = [
+    ("standings.solved", "q"),
+    ("standings.rank", "q"),
+    ("standings.handle", "i"),
+    ("standings.penalty", "q"),
+    ("standings.participation_type", "b"),
+    # offsets of the first problem result of each standing, and one past the last
+    ("standings.results", "q"),
+]
+PROBLEM_RESULT_COLUMNS = [
+    ("results.tries", "i"),
+    ("results.submission_id", "q"),
+    ("results.submission_contest_minutes", "q"),
+    ("results.is_accepted", "b"),
+    ("results.index", "i"),
+]
+SUBMISSION_COLUMNS = [
+    ("submissions.id", "q"),
+    ("submissions.submission_time_utc", "q"),
+    ("submissions.handle", "i"),
+    ("submissions.is_virtual", "b"),
+    ("submissions.problem_index", "i"),
+    ("submissions.language", "i"),
+    ("submissions.verdict", "i"),
+    ("submissions.time", "q"),
+    ("submissions.memory", "q"),
+]
+
+# columns holding indexes into the strings
+STRING_COLUMNS = [
+    "standings.handle",
+    "results.index",
+    "submissions.handle",
+    "submissions.problem_index",
+    "submissions.language",
+    "submissions.verdict",
+]
+
+
+@dataclass
+class ContestSnapshot:
+    gym_id: int
+    is_finished: bool
+    problems: list[Problem]
+    standings: list[StandingRecord]
+    submissions: list[SubmissionRecord]
+
+
+def optional(value: int | None) -> int:
+    return -1 if value is None else value
+
+
+def write_snapshot(snapshot: ContestSnapshot) -> bytes:
+    strings: dict[str, int] = {}
+
+    def string(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    participation_types = list(ParticipationType)
+    columns: dict[str, array] = {
+        name: array(typecode)
+        for name, typecode in STANDING_COLUMNS
+        + PROBLEM_RESULT_COLUMNS
+        + SUBMISSION_COLUMNS
+    }
+
+    columns["standings.results"].append(0)
+    for standing in snapshot.standings:
+        columns["standings.solved"].append(standing.solved)
+        columns["standings.rank"].append(optional(standing.rank))
+        columns["standings.handle"].append(string(standing.handle))
+        columns["standings.penalty"].append(standing.penalty)
+        columns["standings.participation_type"].append(
+            participation_types.index(standing.participation_type)
+        )
+        for result in standing.problem_results:
+            columns["results.tries"].append(result.tries)
+            columns["results.submission_id"].append(optional(result.submission_id))
+            columns["results.submission_contest_minutes"].append(
+                optional(result.submission_contest_minutes)
+            )
+            columns["results.is_accepted"].append(result.is_accepted)
+            columns["results.index"].append(string(result.index))
+        columns["standings.results"].append(len(columns["results.tries"]))
+
+    for submission in snapshot.submissions:
+        columns["submissions.id"].append(submission.id)
+        columns["submissions.submission_time_utc"].append(
+            submission.submission_time_utc
+        )
+        columns["submissions.handle"].append(string(submission.handle))
+        columns["submissions.is_virtual"].append(submission.is_virtual)
+        columns["submissions.problem_index"].append(string(submission.problem_index))
+        columns["submissions.language"].append(string(submission.language))
+        columns["submissions.verdict"].append(string(submission.verdict))
+        columns["submissions.time"].append(submission.time)
+        columns["submissions.memory"].append(submission.memory)
+
+    encoded_strings = [value.encode() for value in strings]
+    string_offsets = array("q", [0])
+    for value in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    meta = {
+        "gym_id": snapshot.gym_id,
+        "is_finished": snapshot.is_finished,
+        "problems": [problem.model_dump() for problem in snapshot.problems],
+        "participation_types": [type.value for type in participation_types],
+    }
+    sections: dict[str, bytes] = {
+        "meta": json.dumps(meta).encode(),
+        "strings": b"".join(encoded_strings),
+        "strings.offsets": to_little_endian(string_offsets),
+    }
+    for name, column in columns.items():
+        sections[name] = to_little_endian(column)
+
+    return pack_sections(sections)
+
+
+def to_little_endian(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def pack_sections(sections: dict[str, bytes]) -> bytes:
+    offset = align(HEADER.size + DIRECTORY_ENTRY.size * len(sections))
+    directory, body = [], []
+    for name, data in sections.items():
+        directory.append(DIRECTORY_ENTRY.pack(name.encode(), offset, len(data)))
+        padding = align(len(data)) - len(data)
+        body.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)) + b"".join(directory)
+    return header + b"\0" * (align(len(header)) - len(header)) + b"".join(body)
+
+
+def align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def read_snapshot(buffer) -> ContestSnapshot:
+    """
+    Reads a snapshot from bytes or a memory map. Numeric columns are read in place.
+    Raises ValueError if the snapshot is truncated or its sections don't agree.
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError("Truncated contest snapshot")
+    magic, version, sections_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a contest snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported contest snapshot version {version}")
+    if HEADER.size + DIRECTORY_ENTRY.size * sections_count > len(view):
+        raise ValueError("Truncated contest snapshot directory")
+
+    sections: dict[str, memoryview] = {}
+    for i in range(sections_count):
+        name, offset, length = DIRECTORY_ENTRY.unpack_from(
+            view, HEADER.size + DIRECTORY_ENTRY.size * i
+        )
+        name = name.rstrip(b"\0").decode()
+        if offset + length > len(view):
+            raise ValueError(f"Section {name} runs past the end of the snapshot")
+        sections[name] = view[offset : offset + length]
+
+    try:
+        return decode_sections(sections)
+    except (KeyError, IndexError, TypeError) as e:
+        # indexes into the strings or the participation types that are out of range
+        raise ValueError(f"Corrupt contest snapshot: {e!r}") from e
+
+
+def row_count(table: str, columns: dict) -> int:
+    counts = {len(values) for values in columns.values()}
+    if len(counts) != 1:
+        raise ValueError(f"Columns of {table} have different lengths")
+    return counts.pop()
+
+
+def check_offsets(name: str, offsets, count: int, end: int):
+    """Offsets of count items must start at 0, never decrease and end at end."""
+    if (
+        len(offsets) != count + 1
+        or offsets[0] != 0
+        or offsets[-1] != end
+        or any(a > b for a, b in zip(offsets, offsets[1:]))
+    ):
+        raise ValueError(f"Section {name} doesn't match the rows it points into")
+
+
+def check_indexes(name: str, indexes, count: int):
+    if indexes and (min(indexes) < 0 or max(indexes) >= count):
+        raise ValueError(f"Section {name} refers past the values it indexes")
+
+
+def decode_sections(sections: dict[str, memoryview]) -> ContestSnapshot:
+    def column(name: str, typecode: str):
+        if name not in sections:
+            raise ValueError(f"Missing section {name}")
+        if len(sections[name]) % array(typecode).itemsize:
+            raise ValueError(f"Section {name} isn't a whole number of values")
+        if sys.byteorder != "little":
+            swapped = array(typecode)
+            swapped.frombytes(sections[name])
+            swapped.byteswap()
+            return swapped
+        return sections[name].cast(typecode)
+
+    if "meta" not in sections or "strings" not in sections:
+        raise ValueError("Missing section meta or strings")
+    meta = json.loads(bytes(sections["meta"]))
+    offsets = column("strings.offsets", "q")
+    blob = bytes(sections["strings"])
+    check_offsets("strings.offsets", offsets, len(offsets) - 1, len(blob))
+    strings = [
+        sys.intern(blob[offsets[i] : offsets[i + 1]].decode())
+        for i in range(len(offsets) - 1)
+    ]
+    participation_types = [
+        ParticipationType(value) for value in meta["participation_types"]
+    ]
+
+    standings = {name: column(name, typecode) for name, typecode in STANDING_COLUMNS}
+    results = {
+        name: column(name, typecode) for name, typecode in PROBLEM_RESULT_COLUMNS
+    }
+    submissions = {
+        name: column(name, typecode) for name, typecode in SUBMISSION_COLUMNS
+    }
+    results_offsets = standings.pop("standings.results")
+    # zip would silently cut longer columns to the shortest one
+    check_offsets(
+        "standings.results",
+        results_offsets,
+        row_count("standings", standings),
+        row_count("results", results),
+    )
+    row_count("submissions", submissions)
+    check_indexes(
+        "standings.participation_type",
+        standings["standings.participation_type"],
+        len(participation_types),
+    )
+    columns = standings | results | submissions
+    for name in STRING_COLUMNS:
+        check_indexes(name, columns[name], len(strings))
+
+    problem_results = [
+        ProblemResultRecord(
+            tries=tries,
+            submission_id=None if submission_id == -1 else submission_id,
+            submission_contest_minutes=None if minutes == -1 else minutes,
+            is_accepted=bool(is_accepted),
+            index=strings[index],
+        )
+        for tries, submission_id, minutes, is_accepted, index in zip(
+            *(results[name] for name, _ in PROBLEM_RESULT_COLUMNS)
+        )
+    ]
+
+    return ContestSnapshot(
+        gym_id=meta["gym_id"],
+        is_finished=meta["is_finished"],
+        problems=[Problem(**problem) for problem in meta["problems"]],
+        standings=[
+            StandingRecord(
+                solved=solved,
+                rank=None if rank == -1 else rank,
+                handle=strings[handle],
+                penalty=penalty,
+                problem_results=problem_results[
+                    results_offsets[i] : results_offsets[i + 1]
+                ],
+                participation_type=participation_types[participation_type],
+            )
+            for i, (solved, rank, handle, penalty, participation_type) in enumerate(
+                zip(*standings.values())
+            )
+        ],
+        submissions=[
+            SubmissionRecord(
+                id=id,
+                submission_time_utc=submission_time_utc,
+                handle=strings[handle],
+                is_virtual=bool(is_virtual),
+                problem_index=strings[problem_index],
+                language=strings[language],
+                verdict=strings[verdict],
+                time=time,
+                memory=memory,
+            )
+            for (
+                id,
+                submission_time_utc,
+                handle,
+                is_virtual,
+                problem_index,
+                language,
+                verdict,
+                time,
+                memory,
+            ) in zip(*(submissions[name] for name, _ in SUBMISSION_COLUMNS))
+        ],
+    )
+
+
+def read_snapshot_file(path: str) -> ContestSnapshot:
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return read_snapshot(buffer)
+
+
+async def import_snapshot(cache: ScrapeCache, snapshot: ContestSnapshot):
+    """
+    Stores the snapshot in the cache, as if the gym had just been scraped.
+    """
+    if snapshot.is_finished:
+        await cache.mark_finished(snapshot.gym_id)
+    await cache.put(snapshot.gym_id, "problems", snapshot.problems)
+    await cache.put(snapshot.gym_id, "standings", snapshot.standings)
+    await cache.put(snapshot.gym_id, "submissions", snapshot.submissions)
+
+
+async def export_snapshot(cache: ScrapeCache, gym_id: int) -> ContestSnapshot:
+    """
+    Returns the snapshot of the gym from the cache, fresh or not.
+    """
+    entries = [
+        await cache.peek(gym_id, resource)
+        for resource in ("problems", "standings", "submissions")
+    ]
+    if any(entry is None for entry in entries):
+        raise LookupError(f"Gym {gym_id} isn't in the cache")
+    problems, standings, submissions = (entry.value for entry in entries)
+    return ContestSnapshot(
+        gym_id, cache.is_finished(gym_id), problems, standings, submissions
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cache", default="scrape_cache.sqlite3")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_command = commands.add_parser("export")
+    export_command.add_argument("gym_id", type=int)
+    export_command.add_argument("path")
+    import_command = commands.add_parser("import")
+    import_command.add_argument("path")
+    args = parser.parse_args()
+
+    cache = ScrapeCache(args.cache)
+    try:
+        if args.command == "export":
+            snapshot = await export_snapshot(cache, args.gym_id)
+            with open(args.path, "wb") as file:
+                file.write(write_snapshot(snapshot))
+        else:
+            snapshot = read_snapshot_file(args.path)
+            await import_snapshot(cache, snapshot)
+        print(
+            f"gym {snapshot.gym_id}: {len(snapshot.problems)} problems, "
+            f"{len(snapshot.standings)} standings, "
+            f"{len(snapshot.submissions)} submissions"
+        )
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import AsyncIterator, Callable
+
+import httpx
+import orjson
+
+from models.records.standing_record import StandingRecord
+from service.codeforces_service import CodeForcesService
+from service.leases import Leases
+
+logger = logging.getLogger(__name__)
+
+# events a subscriber may fall behind by before it is dropped, it reconnects and
+# starts over from a snapshot
+SUBSCRIBER_BACKLOG = 16
+
+# a handle may have several rows of the same participation type, e.g. two virtual
+# participations, told apart by their order
+RowKey = tuple[str, str, int]
+
+
+def key_rows(standings: list[StandingRecord]) -> dict[RowKey, StandingRecord]:
+    occurrences: Counter[tuple[str, str]] = Counter()
+    rows: dict[RowKey, StandingRecord] = {}
+    for standing in standings:
+        key = (standing.handle, standing.participation_type.value)
+        rows[(*key, occurrences[key])] = standing
+        occurrences[key] += 1
+    return rows
+
+
+class GymFeed:
+    """
+    Gym feed holds the last standings of a gym pushed to its subscribers and webhooks.
+    """
+
+    def __init__(self, gym_id: int) -> None:
+        self.gym_id = gym_id
+        # every subscriber's queue of (event, data) to send
+        self.subscribers: set[asyncio.Queue[tuple[str, str]]] = set()
+        self.webhooks: set[str] = set()
+        self.rows: dict[RowKey, StandingRecord] | None = None
+        self.sequence = 0
+        self.task: asyncio.Task | None = None
+        # the serialized snapshot of the current rows, shared by subscribers joining
+        self.snapshot: str | None = None
+
+    @property
+    def is_idle(self) -> bool:
+        return not self.subscribers and not self.webhooks
+
+    def snapshot_event(self) -> str:
+        if self.snapshot is None:
+            # orjson writes the records as they are, like the listing responses
+            self.snapshot = orjson.dumps(
+                {
+                    "event": "snapshot",
+                    "gym_id": self.gym_id,
+                    "sequence": self.sequence,
+                    "standings": list(self.rows.values()),
+                }
+            ).decode()
+        return self.snapshot
+
+    def diff_event(self, rows: dict[RowKey, StandingRecord]) -> str | None:
+        """
+        Returns the event with the rows that changed since the last standings and
+        the rows that are gone, or None if nothing changed.
+        """
+        changed = [row for key, row in rows.items() if self.rows.get(key) != row]
+        removed = [key for key in self.rows if key not in rows]
+        if not changed and not removed:
+            return None
+        return orjson.dumps(
+            {
+                "event": "diff",
+                "gym_id": self.gym_id,
+                "sequence": self.sequence + 1,
+                "changed": changed,
+                "removed": [
+                    {"handle": handle, "participation_type": participation_type}
+                    for handle, participation_type, _ in removed
+                ],
+            }
+        ).decode()
+
+
+def server_sent_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class StandingsFeeds:
+    """
+    Standings feeds push the standings changes of gyms to server sent event
+    subscribers and webhooks. Every gym with a subscriber or a webhook has one
+    refresher, which scrapes the standings every interval seconds and pushes only
+    the rows that changed, serialized once for everyone.
+
+    Subscribers get a snapshot of the whole standings first and diffs after it.
+    Webhooks are kept in memory, they are registered again after a restart. With
+    leases, one worker scrapes a gym per interval and the feeds of the other workers
+    read the standings it stored.
+    """
+
+    def __init__(
+        self,
+        create_service: Callable[[], CodeForcesService],
+        interval: float = 15,
+        keepalive: float = 15,
+        webhook_timeout: float = 10,
+        leases: Leases | None = None,
+    ) -> None:
+        self.create_service = create_service
+        self.interval = interval
+        self.keepalive = keepalive
+        self.leases = leases
+        self.feeds: dict[int, GymFeed] = {}
+        self.webhook_client = httpx.AsyncClient(timeout=webhook_timeout)
+        self.webhook_tasks: set[asyncio.Task] = set()
+
+    async def close(self):
+        tasks = [feed.task for feed in self.feeds.values() if feed.task is not None]
+        for task in [*tasks, *self.webhook_tasks]:
+            task.cancel()
+        await asyncio.gather(*tasks, *self.webhook_tasks, return_exceptions=True)
+        await self.webhook_client.aclose()
+
+    async def subscribe(self, gym_id: int) -> AsyncIterator[str]:
+        """
+        Yields the standings events of the gym as server sent events until the
+        subscriber goes away or falls too far behind.
+        """
+        feed = self.feeds.setdefault(gym_id, GymFeed(gym_id))
+        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(SUBSCRIBER_BACKLOG)
+        feed.subscribers.add(queue)
+        self.__start(feed)
+        try:
+            if feed.rows is not None:
+                yield server_sent_event("snapshot", feed.snapshot_event())
+            while queue in feed.subscribers or not queue.empty():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    # keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield server_sent_event(event, data)
+        finally:
+            feed.subscribers.discard(queue)
+            self.__stop_if_idle(feed)
+
+    def add_webhook(self, gym_id: int, url: str):
+        feed = self.feeds.setdefault(gym_id, GymFeed(gym_id))
+        feed.webhooks.add(url)
+        self.__start(feed)
+
+    def remove_webhook(self, gym_id: int, url: str):
+        feed = self.feeds.get(gym_id)
+        if feed is not None:
+            feed.webhooks.discard(url)
+            self.__stop_if_idle(feed)
+
+    def __start(self, feed: GymFeed):
+        if feed.task is None:
+            feed.task = asyncio.create_task(self.__run(feed))
+
+    def __stop_if_idle(self, feed: GymFeed):
+        if feed.is_idle and self.feeds.get(feed.gym_id) is feed:
+            if feed.task is not None:
+                feed.task.cancel()
+            del self.feeds[feed.gym_id]
+
+    async def __run(self, feed: GymFeed):
+        while True:
+            try:
+                force = feed.rows is not None
+                if force and self.leases is not None:
+                    force = await self.leases.acquire(
+                        f"feed:{feed.gym_id}", self.interval
+                    )
+                standings = await self.create_service().get_contest_standings(
+                    feed.gym_id, force=force
+                )
+                self.__publish(feed, key_rows(standings))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Refreshing standings feed of gym %s failed", feed.gym_id
+                )
+            await asyncio.sleep(self.interval)
+
+    def __publish(self, feed: GymFeed, rows: dict[RowKey, StandingRecord]):
+        if feed.rows is None:
+            feed.rows = rows
+            event, data = "snapshot", feed.snapshot_event()
+        else:
+            event, data = "diff", feed.diff_event(rows)
+            if data is None:
+                return
+            feed.rows = rows
+            feed.sequence += 1
+            feed.snapshot = None
+
+        for queue in list(feed.subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                logger.info("Dropping a lagging subscriber of gym %s", feed.gym_id)
+                feed.subscribers.discard(queue)
+
+        for url in feed.webhooks:
+            task = asyncio.create_task(self.__post_webhook(url, data))
+            self.webhook_tasks.add(task)
+            task.add_done_callback(self.webhook_tasks.discard)
+
+    async def __post_webhook(self, url: str, data: str):
+        try:
+            response = await self.webhook_client.post(
+                url, content=data, headers={"Content-Type": "application/json"}
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("Posting standings webhook %s failed: %r", url, e)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+
+from scraper.parse_executor import ParseExecutor
+from scraper.session_pool import SessionPool
+from scraper.submission_page_parser import parse_submission_page
+from service.leases import Leases
+from service.submission_store import SubmissionStore
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionCrawler:
+    """
+    Submission crawler fetches the pages of queued submissions in the background
+    and stores their details. At most concurrency submission pages are fetched at
+    once, within the upstream concurrency budget shared with user requests.
+
+    The queue lives in the submission store, so crawls of gyms left unfinished by a
+    restart are resumed on start. With leases, a gym is crawled by one worker at a
+    time, which also fetches the submissions queued by the others.
+    """
+
+    def __init__(
+        self,
+        store: SubmissionStore,
+        session_pool: SessionPool,
+        concurrency_budget: asyncio.Semaphore,
+        parse_executor: ParseExecutor,
+        concurrency: int = 4,
+        batch_size: int = 100,
+        leases: Leases | None = None,
+    ) -> None:
+        self.store = store
+        self.session_pool = session_pool
+        self.concurrency_budget = concurrency_budget
+        self.parse_executor = parse_executor
+        self.slots = asyncio.Semaphore(concurrency)
+        self.batch_size = batch_size
+        self.leases = leases
+        self.tasks: dict[int, asyncio.Task] = {}
+        # gyms with submissions queued while their crawl was running
+        self.requeued: set[int] = set()
+
+    async def start(self):
+        for gym_id in await self.store.pending_gyms():
+            logger.info("Resuming submission crawl of gym %s", gym_id)
+            self.__start_crawl(gym_id)
+
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_crawling(self, gym_id: int) -> bool:
+        return gym_id in self.tasks
+
+    async def enqueue(self, gym_id: int, submission_ids: list[int]) -> int:
+        """
+        Queues the submissions of the gym for fetching, submissions fetched before
+        are skipped. Returns the number of newly queued submissions.
+        """
+        queued = await self.store.enqueue(gym_id, submission_ids)
+        self.requeued.add(gym_id)
+        if gym_id not in self.tasks:
+            self.__start_crawl(gym_id)
+        return queued
+
+    def __start_crawl(self, gym_id: int):
+        self.tasks[gym_id] = asyncio.create_task(self.__crawl(gym_id))
+
+    async def __crawl(self, gym_id: int):
+        try:
+            if self.leases is None:
+                await self.__crawl_queue(gym_id)
+                return
+            name = f"crawl:{gym_id}"
+            while await self.leases.acquire(name):
+                async with self.leases.holding(name):
+                    await self.__crawl_queue(gym_id)
+                # submissions queued by another worker while the lease was held, it
+                # didn't get the lease and left them to this worker
+                if not await self.store.pending(gym_id, 1):
+                    break
+        finally:
+            del self.tasks[gym_id]
+
+    async def __crawl_queue(self, gym_id: int):
+        fetched = 0
+        while True:
+            self.requeued.discard(gym_id)
+            submission_ids = await self.store.pending(gym_id, self.batch_size)
+            if not submission_ids:
+                # submissions queued during the query are picked up by another round
+                if gym_id in self.requeued:
+                    continue
+                break
+
+            results = await asyncio.gather(
+                *(
+                    self.__fetch(gym_id, submission_id)
+                    for submission_id in submission_ids
+                )
+            )
+            fetched += sum(results)
+        logger.info("Crawled %d submissions of gym %s", fetched, gym_id)
+
+    async def __fetch(self, gym_id: int, submission_id: int) -> bool:
+        try:
+            async with self.slots, self.concurrency_budget:
+                page = await self.session_pool.get_submission_page(
+                    gym_id, submission_id
+                )
+            detail = await self.parse_executor.run(parse_submission_page, page)
+            if detail.id != submission_id:
+                raise RuntimeError(f"Page of submission {submission_id} is {detail.id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(
+                "Fetching submission %s of gym %s failed", submission_id, gym_id
+            )
+            await self.store.fail(gym_id, submission_id)
+            return False
+
+        await self.store.put(gym_id, detail)
+        return True
@@ -0,0 +1,154 @@
+import asyncio
+import sqlite3
+import threading
+
+from models.domain.submission_detail import SubmissionDetail
+
+
+class SubmissionStore:
+    """
+    Submission store keeps the details of fetched submissions in an SQLite file,
+    along with the queue of submissions still to be fetched. Both survive restarts,
+    so a crawl resumes where it stopped and a submission is only fetched once.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3) -> None:
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS submission_details (
+                gym_id INTEGER NOT NULL,
+                submission_id INTEGER PRIMARY KEY,
+                submission_time_utc INTEGER NOT NULL,
+                source_code TEXT
+            );
+            CREATE INDEX IF NOT EXISTS submission_details_gym
+                ON submission_details (gym_id);
+            CREATE TABLE IF NOT EXISTS crawl_queue (
+                gym_id INTEGER NOT NULL,
+                submission_id INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (gym_id, submission_id)
+            );
+            """
+        )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    async def enqueue(self, gym_id: int, submission_ids: list[int]) -> int:
+        """
+        Queues the submissions that weren't fetched or queued before, returns how
+        many were queued.
+        """
+        return await asyncio.to_thread(self.__enqueue, gym_id, submission_ids)
+
+    async def pending(self, gym_id: int, limit: int) -> list[int]:
+        """
+        Returns up to limit queued submissions that haven't failed too many times.
+        """
+        return await asyncio.to_thread(self.__pending, gym_id, limit)
+
+    async def pending_gyms(self) -> list[int]:
+        return await asyncio.to_thread(self.__pending_gyms)
+
+    async def put(self, gym_id: int, detail: SubmissionDetail):
+        await asyncio.to_thread(self.__put, gym_id, detail)
+
+    async def fail(self, gym_id: int, submission_id: int):
+        await asyncio.to_thread(
+            self.__execute,
+            "UPDATE crawl_queue SET attempts = attempts + 1 WHERE gym_id = ? AND submission_id = ?",
+            (gym_id, submission_id),
+        )
+
+    async def get(self, gym_id: int) -> list[SubmissionDetail]:
+        return await asyncio.to_thread(self.__get, gym_id)
+
+    async def counts(self, gym_id: int) -> tuple[int, int, int]:
+        """
+        Returns the number of fetched, pending and failed submissions of the gym.
+        """
+        return await asyncio.to_thread(self.__counts, gym_id)
+
+    def __execute(self, sql: str, parameters: tuple):
+        with self.lock:
+            self.connection.execute(sql, parameters)
+            self.connection.commit()
+
+    def __enqueue(self, gym_id: int, submission_ids: list[int]) -> int:
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                """
+                INSERT OR IGNORE INTO crawl_queue (gym_id, submission_id)
+                SELECT ?, ? WHERE NOT EXISTS (
+                    SELECT 1 FROM submission_details WHERE submission_id = ?
+                )
+                """,
+                ((gym_id, id, id) for id in submission_ids),
+            )
+            self.connection.commit()
+            return self.connection.total_changes - before
+
+    def __pending(self, gym_id: int, limit: int) -> list[int]:
+        with self.lock:
+            return [
+                submission_id
+                for (submission_id,) in self.connection.execute(
+                    "SELECT submission_id FROM crawl_queue WHERE gym_id = ? AND attempts < ? ORDER BY submission_id LIMIT ?",
+                    (gym_id, self.max_attempts, limit),
+                )
+            ]
+
+    def __pending_gyms(self) -> list[int]:
+        with self.lock:
+            return [
+                gym_id
+                for (gym_id,) in self.connection.execute(
+                    "SELECT DISTINCT gym_id FROM crawl_queue WHERE attempts < ?",
+                    (self.max_attempts,),
+                )
+            ]
+
+    def __put(self, gym_id: int, detail: SubmissionDetail):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO submission_details (gym_id, submission_id, submission_time_utc, source_code) VALUES (?, ?, ?, ?)",
+                (gym_id, detail.id, detail.submission_time_utc, detail.source_code),
+            )
+            self.connection.execute(
+                "DELETE FROM crawl_queue WHERE gym_id = ? AND submission_id = ?",
+                (gym_id, detail.id),
+            )
+            self.connection.commit()
+
+    def __get(self, gym_id: int) -> list[SubmissionDetail]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT submission_id, submission_time_utc, source_code FROM submission_details WHERE gym_id = ? ORDER BY submission_id",
+                (gym_id,),
+            ).fetchall()
+        return [
+            SubmissionDetail(
+                id=submission_id,
+                submission_time_utc=submission_time_utc,
+                source_code=source_code,
+            )
+            for submission_id, submission_time_utc, source_code in rows
+        ]
+
+    def __counts(self, gym_id: int) -> tuple[int, int, int]:
+        with self.lock:
+            (fetched,) = self.connection.execute(
+                "SELECT COUNT(*) FROM submission_details WHERE gym_id = ?", (gym_id,)
+            ).fetchone()
+            pending, failed = self.connection.execute(
+                "SELECT COALESCE(SUM(attempts < ?), 0), COALESCE(SUM(attempts >= ?), 0) FROM crawl_queue WHERE gym_id = ?",
+                (self.max_attempts, self.max_attempts, gym_id),
+            ).fetchone()
+        return fetched, pending, failed
@@ -0,0 +1,200 @@
+from array import array
+from collections import OrderedDict, defaultdict
+from math import inf
+
+from models.domain.problem import Problem
+from models.domain.standing import ParticipationType
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
+from models.requests.contest_summary_request import ContestSummaryRequest
+from models.responses.contest_summary import ContestSummary, SingleRow
+
+
+class RankedStandings:
+    """
+    Standings that take part in a summary, sorted and re-ranked once, stored as
+    columns. Rows of a handle are kept in rank order so a summary only looks at the
+    rows of the requested handles. Without rerank, the ranks codeforces shows are
+    kept, which is what a summary of partial standings has to use.
+    """
+
+    def __init__(
+        self,
+        standings: list[StandingRecord],
+        submission_times: dict[int, int],
+        earliest_submission: dict[str, int],
+        virtual_enabled: bool,
+        rerank: bool = True,
+    ) -> None:
+        # remove non in contest participation if virtual disabled
+        kept = [
+            standing
+            for standing in standings
+            if standing.participation_type == ParticipationType.IN_CONTEST
+            or (
+                virtual_enabled
+                and standing.participation_type == ParticipationType.VIRTUAL
+            )
+        ]
+
+        if virtual_enabled:
+            # virtual participation is dropped for participants who were in the contest
+            in_contest_participants = {
+                standing.handle
+                for standing in kept
+                if standing.participation_type == ParticipationType.IN_CONTEST
+            }
+            kept = [
+                standing
+                for standing in kept
+                if standing.participation_type == ParticipationType.IN_CONTEST
+                or standing.handle not in in_contest_participants
+            ]
+
+        kept.sort(key=lambda standing: standing.rank)
+
+        self.ranks = array("q")
+        self.solved = array("q")
+        # the time a participation started to count, used against virtual deadlines
+        self.earliest_times = array("d")
+        self.participation_types: list[ParticipationType] = []
+        self.rows_by_handle: defaultdict[str, list[int]] = defaultdict(list)
+
+        for i, standing in enumerate(kept):
+            if not rerank:
+                rank = standing.rank
+            elif i == 0:
+                rank = 1
+            elif standing.penalty == kept[i - 1].penalty:
+                rank = self.ranks[i - 1]
+            else:
+                rank = i + 1
+
+            earliest_time = min(
+                (
+                    submission_times.get(result.submission_id, inf)
+                    for result in standing.problem_results
+                    if result.is_accepted
+                ),
+                default=inf,
+            )
+            if earliest_time == inf:
+                # user didn't solve any problem, so we take the time of the earliest submission by this user
+                # this is only needed for virtual participation, because in contest participation is not
+                # checked against virtual deadline
+                earliest_time = earliest_submission.get(standing.handle, inf)
+
+            self.ranks.append(rank)
+            self.solved.append(standing.solved)
+            self.earliest_times.append(earliest_time)
+            self.participation_types.append(standing.participation_type)
+            self.rows_by_handle[standing.handle].append(i)
+
+
+class SummaryIndex:
+    """
+    Per gym indexes built once from a scraped snapshot, answering summaries for any
+    handles, deadline and virtual flag without walking the whole contest again.
+    Standings are partial when only the rows of some handles were fetched, the
+    times of their submissions may then be given instead of the submissions.
+    """
+
+    def __init__(
+        self,
+        submissions: list[SubmissionRecord],
+        standings: list[StandingRecord],
+        problems: list[Problem],
+        partial: bool = False,
+        submission_times: dict[int, int] | None = None,
+    ) -> None:
+        # kept to tell whether the index is still built from the current snapshot
+        self.submissions = submissions
+        self.standings = standings
+        self.problems = problems
+        self.partial = partial
+
+        self.submission_times: dict[int, int] = dict(submission_times or {})
+        self.earliest_submission: dict[str, int] = {}
+        for sub in submissions:
+            self.submission_times[sub.id] = sub.submission_time_utc
+            if sub.submission_time_utc < self.earliest_submission.get(sub.handle, inf):
+                self.earliest_submission[sub.handle] = sub.submission_time_utc
+
+        # ranked standings depend on the virtual flag only, built on first use
+        self.ranked: dict[bool, RankedStandings] = {}
+
+    def is_built_from(self, submissions, standings, problems) -> bool:
+        return (
+            self.submissions is submissions
+            and self.standings is standings
+            and self.problems is problems
+        )
+
+    def summarize(self, request: ContestSummaryRequest) -> ContestSummary:
+        virtual_enabled = request.virtual_enabled
+        if virtual_enabled not in self.ranked:
+            self.ranked[virtual_enabled] = RankedStandings(
+                self.standings,
+                self.submission_times,
+                self.earliest_submission,
+                virtual_enabled,
+                rerank=not self.partial,
+            )
+        ranked = self.ranked[virtual_enabled]
+
+        summary = ContestSummary(total_problems=len(self.problems), rows={})
+
+        for handle in map(str.lower, request.handles):
+            # Earliest standing for each handle is used, if multiple encountered
+            best: int | None = None
+            for row in ranked.rows_by_handle.get(handle, ()):
+                if (
+                    ranked.participation_types[row] == ParticipationType.VIRTUAL
+                    and ranked.earliest_times[row] > request.virtual_deadline_utc
+                ):
+                    continue
+                if (
+                    best is None
+                    or ranked.earliest_times[row] < ranked.earliest_times[best]
+                ):
+                    best = row
+
+            summary.rows[handle] = (
+                None
+                if best is None
+                else SingleRow(
+                    rank=ranked.ranks[best],
+                    ac_count=ranked.solved[best],
+                    participation_type=ranked.participation_types[best],
+                )
+            )
+
+        return summary
+
+
+class SummaryEngine:
+    """
+    Summary engine keeps the summary index of recently summarized gyms, so
+    summaries of the same snapshot reuse it.
+    """
+
+    def __init__(self, max_gyms: int = 16) -> None:
+        self.max_gyms = max_gyms
+        self.indexes: OrderedDict[int, SummaryIndex] = OrderedDict()
+
+    def index(
+        self,
+        gym_id: int,
+        submissions: list[SubmissionRecord],
+        standings: list[StandingRecord],
+        problems: list[Problem],
+    ) -> SummaryIndex:
+        index = self.indexes.get(gym_id)
+        if index is None or not index.is_built_from(submissions, standings, problems):
+            index = SummaryIndex(submissions, standings, problems)
+            self.indexes[gym_id] = index
+
+        self.indexes.move_to_end(gym_id)
+        while len(self.indexes) > self.max_gyms:
+            self.indexes.popitem(last=False)
+        return index
@@ -0,0 +1,49 @@
+import json
+import os
+
+
+class WatchRegistry:
+    """
+    Watch registry is the set of gyms kept warm by the refresh scheduler. It is
+    persisted as a JSON file, so watched gyms survive restarts. The file is read
+    again when it changes, so workers sharing it see each other's changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__gym_ids: set[int] = set()
+        # modification time of the file when it was last read
+        self.loaded_mtime: int | None = None
+
+    @property
+    def gym_ids(self) -> set[int]:
+        self.__reload()
+        return self.__gym_ids
+
+    def add(self, gym_id: int):
+        self.__reload()
+        self.__gym_ids.add(gym_id)
+        self.__save()
+
+    def remove(self, gym_id: int):
+        self.__reload()
+        self.__gym_ids.discard(gym_id)
+        self.__save()
+
+    def __reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.loaded_mtime:
+            with open(self.path) as file:
+                self.__gym_ids = set(json.load(file))
+            self.loaded_mtime = mtime
+
+    def __save(self):
+        # written to a temporary file first, so a crash never leaves a broken registry
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(sorted(self.__gym_ids), file)
+        os.replace(temporary_path, self.path)
+        self.loaded_mtime = os.stat(self.path).st_mtime_ns
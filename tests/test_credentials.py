@@ -0,0 +1,22 @@
+"""
+Tests of parsing CODEFORCES_CREDENTIALS.
+"""
+import pytest
+
+from main import parse_credentials
+
+
+def test_pairs():
+    assert parse_credentials("alice:secret, bob:hunter2,") == [
+        ("alice", "secret"),
+        ("bob", "hunter2"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "credentials", ["alice", "alice:", ":secret", "alice:secret:more", "a:b,alice"]
+)
+def test_malformed_pair_is_named_without_its_password(credentials):
+    with pytest.raises(ValueError, match="must be handle:password") as error:
+        parse_credentials(credentials)
+    assert "secret" not in str(error.value)
@@ -0,0 +1,61 @@
+"""
+Tests of how the page loader retries overloaded upstream responses.
+"""
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from scraper.page_loader import PageLoader, retry_after_seconds
+from scraper.rate_limiter import RateLimiter
+
+LOGGED_IN = '<a href="/logout">Logout</a>'
+LOGIN_PAGE = '<input type="hidden" name="csrf_token" value="token"/>'
+
+
+def load_page(retry_after: str) -> list[str]:
+    """Loads a page that is overloaded once, returns the paths requested."""
+    paths: list[str] = []
+
+    def handle_request(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path == "/enter":
+            return httpx.Response(
+                200, text=LOGGED_IN if request.method == "POST" else LOGIN_PAGE
+            )
+        if paths.count(request.url.path) == 1:
+            return httpx.Response(503, headers={"Retry-After": retry_after})
+        return httpx.Response(200, text=LOGGED_IN)
+
+    async def run():
+        page_loader = PageLoader(
+            {"handleOrEmail": "test", "password": "test", "retryBackoffMax": 10},
+            RateLimiter(rate=1e6, burst=10**6, max_rate=1e6),
+            httpx.MockTransport(handle_request),
+        )
+        try:
+            await page_loader.get("https://codeforces.com/gym/1")
+        finally:
+            await page_loader.close()
+
+    asyncio.run(run())
+    return paths
+
+
+def test_short_retry_after_is_waited_for():
+    assert load_page("0").count("/gym/1") == 2
+
+
+def test_long_retry_after_gives_up_with_the_upstream_error():
+    start = time.monotonic()
+    with pytest.raises(httpx.HTTPStatusError):
+        load_page("86400")
+    assert time.monotonic() - start < 5
+
+
+def test_retry_after_as_http_date():
+    assert retry_after_seconds(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert 3500 < retry_after_seconds(formatdate(time.time() + 3600, usegmt=True))
+    assert retry_after_seconds("soon") is None
@@ -0,0 +1,80 @@
+"""
+Golden tests of the page parsers. The fixtures are saved codeforces pages, and the
+golden files hold what the original html.parser based parsers returned for them.
+Every parser backend has to return exactly that.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from scraper import soup
+from scraper.problems_page_parser import parse_gym_page, parse_problems
+from scraper.standing_page_parser import (
+    get_page_count,
+    parse_standings,
+    parse_standings_with_page_count,
+)
+from scraper.status_page_parser import (
+    get_status_page_count,
+    parse_status_page,
+    parse_status_page_with_page_count,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+GOLDEN = Path(__file__).parent / "golden"
+
+
+def load(name: str) -> tuple[str, dict]:
+    page = (FIXTURES / f"{name}.html").read_text()
+    golden = json.loads((GOLDEN / f"{name}.json").read_text())
+    return page, golden
+
+
+def dump(rows) -> list[dict]:
+    return [
+        (row.to_model() if hasattr(row, "to_model") else row).model_dump(mode="json")
+        for row in rows
+    ]
+
+
+@pytest.fixture(params=["lxml", "html.parser"], autouse=True)
+def parser_backend(request, monkeypatch):
+    if request.param == "lxml":
+        pytest.importorskip("lxml")
+    monkeypatch.setattr(soup, "PARSER_BACKEND", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("name", ["standings_page", "standings_single_page"])
+def test_standings(name):
+    page, golden = load(name)
+    assert dump(parse_standings(page)) == golden["rows"]
+    assert get_page_count(page) == golden["page_count"]
+
+    standings, page_count = parse_standings_with_page_count(page)
+    assert dump(standings) == golden["rows"]
+    assert page_count == golden["page_count"]
+
+
+@pytest.mark.parametrize("name", ["status_page", "status_single_page"])
+def test_status(name):
+    page, golden = load(name)
+    assert dump(parse_status_page(page)) == golden["rows"]
+    assert get_status_page_count(page) == golden["page_count"]
+
+    submissions, page_count = parse_status_page_with_page_count(page)
+    assert dump(submissions) == golden["rows"]
+    assert page_count == golden["page_count"]
+
+
+@pytest.mark.parametrize(
+    "name, is_finished", [("gym_page", True), ("gym_page_running", False)]
+)
+def test_gym_page(name, is_finished):
+    page, golden = load(name)
+    assert dump(parse_problems(page)) == golden["rows"]
+
+    problems, finished = parse_gym_page(page)
+    assert dump(problems) == golden["rows"]
+    assert finished == is_finished
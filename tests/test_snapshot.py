@@ -0,0 +1,107 @@
+"""
+Tests of reading contest snapshots. A snapshot that is cut short or whose columns
+don't agree must be rejected, never imported with part of its rows.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from models.domain.problem import Problem
+from models.domain.standing import ParticipationType
+from models.records.problem_result_record import ProblemResultRecord
+from models.records.standing_record import StandingRecord
+from models.records.submission_record import SubmissionRecord
+from service.snapshot import (
+    DIRECTORY_ENTRY,
+    HEADER,
+    ContestSnapshot,
+    pack_sections,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+def make_snapshot() -> ContestSnapshot:
+    return ContestSnapshot(
+        gym_id=1,
+        is_finished=True,
+        problems=[Problem(index="A", in_contest_name="Sum")],
+        standings=[
+            StandingRecord(
+                solved=1,
+                rank=rank,
+                handle=handle,
+                penalty=10,
+                problem_results=[
+                    ProblemResultRecord(
+                        tries=0,
+                        submission_id=submission_id,
+                        submission_contest_minutes=10,
+                        is_accepted=True,
+                        index="A",
+                    )
+                ],
+                participation_type=ParticipationType.IN_CONTEST,
+            )
+            for rank, handle, submission_id in [(1, "alice", 11), (2, "bob", 12)]
+        ],
+        submissions=[
+            SubmissionRecord(
+                id=submission_id,
+                submission_time_utc=1696154400 + submission_id,
+                handle=handle,
+                is_virtual=False,
+                problem_index="A",
+                language="GNU C++17",
+                verdict="Accepted",
+                time=15,
+                memory=100,
+            )
+            for handle, submission_id in [("alice", 11), ("bob", 12)]
+        ],
+    )
+
+
+def sections_of(data: bytes) -> dict[str, bytes]:
+    _, _, sections_count = HEADER.unpack_from(data)
+    sections = {}
+    for i in range(sections_count):
+        name, offset, length = DIRECTORY_ENTRY.unpack_from(
+            data, HEADER.size + DIRECTORY_ENTRY.size * i
+        )
+        sections[name.rstrip(b"\0").decode()] = data[offset : offset + length]
+    return sections
+
+
+def test_round_trip():
+    snapshot = make_snapshot()
+    assert read_snapshot(write_snapshot(snapshot)) == snapshot
+
+
+def test_truncated_snapshot_is_rejected():
+    data = write_snapshot(make_snapshot())
+    # the last section has no padding, so every cut loses data
+    for size in [0, HEADER.size - 1, HEADER.size + 8, len(data) // 2, len(data) - 8]:
+        with pytest.raises(ValueError):
+            read_snapshot(data[:size])
+
+
+def test_unequal_column_lengths_are_rejected():
+    sections = sections_of(write_snapshot(make_snapshot()))
+    sections["submissions.time"] = sections["submissions.time"][:-8]
+    with pytest.raises(ValueError, match="different lengths"):
+        read_snapshot(pack_sections(sections))
+
+
+def test_out_of_range_string_index_is_rejected():
+    sections = sections_of(write_snapshot(make_snapshot()))
+    sections["standings.handle"] = (-1).to_bytes(4, "little", signed=True) * 2
+    with pytest.raises(ValueError):
+        read_snapshot(pack_sections(sections))
+
+
+@pytest.mark.parametrize("cut", [8, 100])
+def test_import_of_a_broken_snapshot_is_422(cut):
+    data = write_snapshot(make_snapshot())
+    response = TestClient(main.app).put("/contest/1/snapshot", content=data[:-cut])
+    assert response.status_code == 422
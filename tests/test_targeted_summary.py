@@ -0,0 +1,81 @@
+"""
+Tests of the upstream requests a targeted summary makes. It must never cost more
+than scraping the status listing it is there to avoid.
+"""
+import asyncio
+
+import httpx
+
+from benchmarks.fake_codeforces import FakeCodeforces, SyntheticGym
+from models.requests.contest_summary_request import ContestSummaryRequest
+from scraper.page_loader import PageLoader
+from scraper.parse_executor import ParseExecutor
+from scraper.rate_limiter import RateLimiter
+from service.codeforces_service import CodeForcesService
+from service.scrape_cache import ScrapeCache
+
+
+def summarize(gym: SyntheticGym, handles: list[str], cache_path) -> list[str]:
+    """Returns the paths of the upstream requests of a targeted summary."""
+    upstream = FakeCodeforces(gym)
+    paths: list[str] = []
+
+    async def handle_request(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return await upstream.handle_request(request)
+
+    async def run():
+        page_loader = PageLoader(
+            {"handleOrEmail": "test", "password": "test"},
+            RateLimiter(rate=1e6, burst=10**6, max_rate=1e6),
+            httpx.MockTransport(handle_request),
+        )
+        cache = ScrapeCache(str(cache_path))
+        parse_executor = ParseExecutor("inline")
+        service = CodeForcesService(
+            page_loader, cache=cache, parse_executor=parse_executor
+        )
+        try:
+            await service.get_contest_summary(
+                ContestSummaryRequest(
+                    gym_id=1,
+                    virtual_enabled=True,
+                    virtual_deadline_utc=gym.start_utc + 3 * 60 * 60,
+                    handles=handles,
+                    targeted=True,
+                )
+            )
+        finally:
+            await page_loader.close()
+            cache.close()
+
+    asyncio.run(run())
+    return paths
+
+
+def virtual_handles(gym: SyntheticGym) -> list[str]:
+    solved = {participant: solved for participant, _, solved, *_ in gym.standings}
+    return [
+        gym.handle(participant)
+        for participant, kind in enumerate(gym.kinds)
+        if kind == "virtual" and solved.get(participant, 0) > 1
+    ]
+
+
+def test_many_handles_fall_back_to_the_status_listing(tmp_path):
+    gym = SyntheticGym(500, 200)
+    handles = virtual_handles(gym)
+    paths = summarize(gym, handles, tmp_path / "cache.sqlite3")
+
+    assert not any("/submission/" in path for path in paths)
+    # the first status page is fetched once more to count the pages
+    assert sum(path.endswith("/status") for path in paths) <= gym.status_pages + 1
+
+
+def test_few_handles_fetch_their_submission_pages(tmp_path):
+    gym = SyntheticGym(500, 200)
+    handles = virtual_handles(gym)[:1]
+    paths = summarize(gym, handles, tmp_path / "cache.sqlite3")
+
+    assert any("/submission/" in path for path in paths)
+    assert sum(path.endswith("/status") for path in paths) == 1